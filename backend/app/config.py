@@ -17,6 +17,45 @@ class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+    
+    # Stateless auth: trust the user claims in the token instead of loading the user
+    AUTH_STATELESS: bool = os.getenv("AUTH_STATELESS", "false").lower() == "true"
+    AUTH_REVOCATION_REFRESH_SECONDS: int = int(os.getenv("AUTH_REVOCATION_REFRESH_SECONDS", "30"))
+    
+    # Password hashing (bcrypt runs on a dedicated, size-limited thread pool)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    BCRYPT_WORKERS: int = int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 1)))
+    BCRYPT_MAX_PENDING: int = int(os.getenv("BCRYPT_MAX_PENDING", "64"))
+    
+    # Login admission control (token buckets per client IP and per username)
+    LOGIN_IP_BURST: int = int(os.getenv("LOGIN_IP_BURST", "20"))
+    LOGIN_IP_PER_MINUTE: float = float(os.getenv("LOGIN_IP_PER_MINUTE", "10"))
+    LOGIN_USERNAME_BURST: int = int(os.getenv("LOGIN_USERNAME_BURST", "5"))
+    LOGIN_USERNAME_PER_MINUTE: float = float(os.getenv("LOGIN_USERNAME_PER_MINUTE", "3"))
+    LOGIN_LIMITER_MAX_KEYS: int = int(os.getenv("LOGIN_LIMITER_MAX_KEYS", "10000"))
+    
+    # User lookup cache (per process; entries also drop on update/delete)
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "1024"))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+    
+    # Report result cache (per process; entries also drop on task/project/user writes)
+    REPORT_CACHE_SIZE: int = int(os.getenv("REPORT_CACHE_SIZE", "128"))
+    REPORT_CACHE_TTL_SECONDS: int = int(os.getenv("REPORT_CACHE_TTL_SECONDS", "30"))
+    
+    # In-memory analytics snapshot of the tasks: minimum seconds between refreshes
+    ANALYTICS_REFRESH_SECONDS: float = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "5"))
+    
+    # Asynchronous report jobs (bounded worker pool and queue; CPU steps run in processes)
+    REPORT_JOB_WORKERS: int = int(os.getenv("REPORT_JOB_WORKERS", "2"))
+    REPORT_JOB_MAX_QUEUE: int = int(os.getenv("REPORT_JOB_MAX_QUEUE", "100"))
+    REPORT_JOB_PROCESSES: int = int(os.getenv("REPORT_JOB_PROCESSES", "2"))
+    REPORT_JOB_TTL_HOURS: int = int(os.getenv("REPORT_JOB_TTL_HOURS", "24"))
+    
+    # History retention: entries older than the window move to the compressed archive (0 keeps everything)
+    HISTORY_RETENTION_DAYS: int = int(os.getenv("HISTORY_RETENTION_DAYS", "180"))
+    HISTORY_ARCHIVE_INTERVAL_HOURS: float = float(os.getenv("HISTORY_ARCHIVE_INTERVAL_HOURS", "24"))
+    HISTORY_ARCHIVE_BATCH_SIZE: int = int(os.getenv("HISTORY_ARCHIVE_BATCH_SIZE", "5000"))
     
     # CORS Configuration  
     CORS_ORIGINS: List[str] = os.getenv(
@@ -24,6 +63,20 @@ class Settings:
         "http://localhost:5173,http://localhost:3000"
     ).split(",")
     
+    # Write-behind Configuration (history and notification side effects)
+    WRITE_BEHIND_SYNC: bool = os.getenv("WRITE_BEHIND_SYNC", "false").lower() == "true"
+    WRITE_BEHIND_MAX_QUEUE: int = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000"))
+    WRITE_BEHIND_BATCH_SIZE: int = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+    WRITE_BEHIND_FLUSH_MS: int = int(os.getenv("WRITE_BEHIND_FLUSH_MS", "50"))
+    WRITE_BEHIND_RETRIES: int = int(os.getenv("WRITE_BEHIND_RETRIES", "5"))
+    WRITE_BEHIND_RETRY_BACKOFF_MS: int = int(os.getenv("WRITE_BEHIND_RETRY_BACKOFF_MS", "100"))
+    
+    # Import Configuration
+    IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+    IMPORT_MAX_REPORTED_ERRORS: int = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+    
+    # Admin Configuration
+    
     # Application Configuration
     APP_NAME: str = os.getenv("APP_NAME", "Task Manager API")
     APP_VERSION: str = os.getenv("APP_VERSION", "1.0.0")
@@ -1,8 +1,16 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.database import connect_to_mongo, close_mongo_connection
-from app.routers import auth, tasks, projects, comments, notifications, history, reports
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.routers import auth, tasks, projects, comments, notifications, history, reports, admin
+from app.services.index_service import IndexService
+from app.services.write_behind import write_behind
+from app.services.token_revocation import revocation_list
+from app.services.counter_service import CounterService
+from app.services.activity_service import ActivityService
+from app.services.report_jobs import report_jobs
+from app.services.history_retention import history_retention
 
 # Create FastAPI application
 app = FastAPI(
@@ -20,16 +28,79 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Background tasks started on startup
+background_tasks = set()
+
+# Seconds between attempts of a failed startup build
+BOOTSTRAP_RETRY_SECONDS = 60
+
+
+async def reconcile_indexes():
+    """Build any declared index missing from the database and drop obsolete ones"""
+    try:
+        result = await IndexService(get_database()).reconcile()
+        for collection, names in result["created"].items():
+            print(f"Created indexes on {collection}: {', '.join(names)}")
+        for collection, names in result["dropped"].items():
+            print(f"Dropped obsolete indexes on {collection}: {', '.join(names)}")
+        for collection, error in result["errors"].items():
+            print(f"Index reconciliation failed on {collection}: {error}")
+    except Exception as e:
+        print(f"Index reconciliation failed: {e}")
+
+
+async def bootstrap_counters():
+    """Build the task counters from the tasks if they have never been built, retrying until it succeeds"""
+    while True:
+        try:
+            counter_service = CounterService(get_database())
+            if not await counter_service.is_initialized():
+                result = await counter_service.rebuild()
+                print(f"Built {result['keys']} task counters")
+            return
+        except Exception as e:
+            print(f"Task counter bootstrap failed, retrying in {BOOTSTRAP_RETRY_SECONDS}s: {e}")
+        await asyncio.sleep(BOOTSTRAP_RETRY_SECONDS)
+
+
+async def bootstrap_activity_rollup():
+    """Build the daily activity rollup from the history if it has never been built"""
+    try:
+        activity_service = ActivityService(get_database())
+        if not await activity_service.is_initialized():
+            result = await activity_service.rebuild()
+            print(f"Rolled up {result['entries']} history entries")
+    except Exception as e:
+        print(f"Activity rollup bootstrap failed: {e}")
+
+
 # Event handlers
 @app.on_event("startup")
 async def startup_event():
-    """Connect to database on startup"""
+    """Connect to database and start background workers on startup"""
     await connect_to_mongo()
+    write_behind.start()
+    revocation_list.start(get_database())
+    report_jobs.start(get_database())
+    history_retention.start(get_database())
+    
+    # Index builds and the first counter and rollup builds can take a while
+    # on large collections, don't block startup
+    for job in (reconcile_indexes(), bootstrap_counters(), bootstrap_activity_rollup()):
+        task = asyncio.create_task(job)
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Close database connection on shutdown"""
+    """Stop background tasks, flush pending writes and close database connection on shutdown"""
+    for task in list(background_tasks):
+        task.cancel()
+    await report_jobs.stop()
+    await history_retention.stop()
+    await write_behind.stop()
+    await revocation_list.stop()
     await close_mongo_connection()
 
 
@@ -41,6 +112,7 @@ app.include_router(comments.router)
 app.include_router(notifications.router)
 app.include_router(history.router)
 app.include_router(reports.router)
+app.include_router(admin.router)
 
 
 # Root endpoint
@@ -0,0 +1,68 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import List, Dict, Any, Tuple
+from datetime import datetime
+from pymongo import IndexModel, UpdateOne
+
+# Counters kept per scope and day
+ACTIVITY_FIELDS = ("created", "completed", "reopened", "deleted", "moved_in", "moved_out", "cycle_seconds")
+
+
+class ActivityRollupRepository:
+    """Repository for the daily activity rollup of the history collection
+    
+    One document per scope ("global", "project:<id>", "assignee:<id>") and
+    UTC day, holding the counters of ACTIVITY_FIELDS. Rebuilds are written
+    to a separate collection and swapped in when complete.
+    """
+    
+    INDEXES = [
+        IndexModel([("scope", 1), ("day", 1)], unique=True)
+    ]
+    
+    def __init__(self, db: AsyncIOMotorDatabase, collection: str = "history_daily"):
+        self.db = db
+        self.collection = db[collection]
+    
+    async def create_indexes(self):
+        """Create indexes for the rollup collection"""
+        await self.collection.create_indexes(self.INDEXES)
+    
+    async def apply(self, deltas: Dict[Tuple[str, datetime], Dict[str, float]]):
+        """Increment the counters of several (scope, day) documents in one bulk write"""
+        operations = [
+            UpdateOne(
+                {"_id": f"{scope}|{day:%Y-%m-%d}"},
+                {"$inc": fields, "$setOnInsert": {"scope": scope, "day": day}},
+                upsert=True
+            )
+            for (scope, day), fields in deltas.items() if fields
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+    
+    async def exists(self) -> bool:
+        """Whether the rollup has any document"""
+        return await self.collection.find_one({}, {"_id": 1}) is not None
+    
+    async def reset(self):
+        """Drop the rollup collection and recreate it empty with its indexes"""
+        await self.collection.drop()
+        await self.create_indexes()
+    
+    async def replace_with(self, source: "ActivityRollupRepository"):
+        """Swap in the rollup built in another collection, dropping the current one"""
+        await source.collection.rename(self.collection.name, dropTarget=True)
+    
+    async def aggregate(self, scope: str, start: datetime, end: datetime, unit: str) -> List[Dict[str, Any]]:
+        """Sum the daily counters of a scope into $dateTrunc buckets (day/week)"""
+        pipeline = [
+            {"$match": {"scope": scope, "day": {"$gte": start, "$lt": end}}},
+            {"$group": {
+                "_id": {"$dateTrunc": {"date": "$day", "unit": unit, "startOfWeek": "monday"}},
+                **{field: {"$sum": f"${field}"} for field in ACTIVITY_FIELDS}
+            }},
+            {"$sort": {"_id": 1}},
+            {"$project": {"_id": 0, "period": "$_id", **{field: 1 for field in ACTIVITY_FIELDS}}}
+        ]
+        
+        return [bucket async for bucket in self.collection.aggregate(pipeline)]
@@ -2,18 +2,22 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List
 from datetime import datetime
 from bson import ObjectId
+from pymongo import IndexModel
 
 
 class CommentRepository:
     """Repository for Comment data operations"""
     
+    INDEXES = [
+        IndexModel([("task_id", 1), ("created_at", 1)])
+    ]
+    
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.comments
     
     async def create_indexes(self):
         """Create indexes for the comments collection"""
-        await self.collection.create_index("task_id")
-        await self.collection.create_index("created_at")
+        await self.collection.create_indexes(self.INDEXES)
     
     async def create(self, comment_data: dict) -> dict:
         """Create a new comment"""
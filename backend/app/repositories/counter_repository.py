@@ -0,0 +1,64 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import List, Optional, Dict
+from pymongo import UpdateOne
+from datetime import datetime
+import re
+
+# Identifies the document recording that the counters were built
+_STATE_ID = "counters"
+
+
+class CounterRepository:
+    """Repository for materialized task counters
+
+    One document per dimension key ("global", "project:<id>", "assignee:<id>"),
+    holding a total plus per-status and per-priority counts.
+    task_counters_state records when they were last built from the tasks.
+    """
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.task_counters
+        self.state = db.task_counters_state
+    
+    async def apply(self, deltas: Dict[str, Dict[str, int]]):
+        """Increment counter fields (dotted paths) of several keys in one bulk write
+        
+        A key given zero deltas is still created if missing.
+        """
+        operations = [
+            UpdateOne({"_id": key}, {"$inc": fields}, upsert=True)
+            for key, fields in deltas.items() if fields
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+    
+    async def get(self, key: str) -> Optional[dict]:
+        """Get the counters of one key"""
+        return await self.collection.find_one({"_id": key})
+    
+    async def get_by_prefix(self, prefix: str) -> List[dict]:
+        """Get the counters of every key of one dimension"""
+        counters = []
+        cursor = self.collection.find({"_id": {"$regex": f"^{re.escape(prefix)}"}})
+        async for counter in cursor:
+            counters.append(counter)
+        return counters
+    
+    async def get_all(self) -> Dict[str, dict]:
+        """Get every counter document keyed by its key"""
+        counters = {}
+        async for counter in self.collection.find({}):
+            counters[counter["_id"]] = counter
+        return counters
+    
+    async def mark_built(self):
+        """Record that the counters have been built from the tasks"""
+        await self.state.update_one(
+            {"_id": _STATE_ID},
+            {"$set": {"built_at": datetime.utcnow()}},
+            upsert=True
+        )
+    
+    async def is_built(self) -> bool:
+        """Whether the counters have ever been built from the tasks"""
+        return await self.state.find_one({"_id": _STATE_ID}, {"_id": 1}) is not None
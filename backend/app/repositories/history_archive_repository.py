@@ -0,0 +1,200 @@
+import zlib
+import bson
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
+from datetime import datetime
+from bson import Binary, ObjectId
+from pymongo import IndexModel, ReplaceOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from starlette.concurrency import run_in_threadpool
+from app.repositories.history_repository import expand_entry
+
+# Identifies the retention state document
+_STATE_ID = "retention"
+
+
+def month_start(moment: datetime) -> datetime:
+    """First instant of the UTC month containing a moment"""
+    return datetime(moment.year, moment.month, 1)
+
+
+def archive_id(task_id: str, month: datetime) -> str:
+    """ID of the archive document holding a task's entries for a month"""
+    return f"{task_id}|{month:%Y-%m}"
+
+
+def pack_entries(task_id: str, month: datetime, entries: List[dict]) -> dict:
+    """Build an archive document from a task's entries for one month
+    
+    Entries are BSON-encoded (keeping datetimes and ObjectIds) and
+    zlib-compressed; the time range and the actions they expand to stay
+    queryable alongside.
+    """
+    entries = sorted(entries, key=lambda entry: (entry["timestamp"], entry["_id"]))
+    return {
+        "_id": archive_id(task_id, month),
+        "task_id": task_id,
+        "month": month,
+        "first_timestamp": entries[0]["timestamp"],
+        "last_timestamp": entries[-1]["timestamp"],
+        "count": len(entries),
+        "actions": sorted({item["action"] for entry in entries for item in expand_entry(entry)}),
+        "entries": Binary(zlib.compress(bson.encode({"entries": entries})))
+    }
+
+
+def unpack_entries(document: dict) -> List[dict]:
+    """Decompress the entries of an archive document"""
+    return bson.decode(zlib.decompress(document["entries"]))["entries"]
+
+
+class HistoryArchiveRepository:
+    """Repository for archived history (history_archive)
+    
+    History older than the retention window is moved here, one document per
+    task and UTC month with the entries compressed. history_archive_state
+    holds the retention watermark (every archived entry is older than it)
+    and the lease that keeps archiving to one process at a time.
+    """
+    
+    # Pages scan documents newest entry first, per task or globally
+    INDEXES = [
+        IndexModel([("task_id", 1), ("last_timestamp", -1)]),
+        IndexModel([("last_timestamp", -1)])
+    ]
+    
+    # Month-ordered scans read whole months; dropped on reconcile
+    OBSOLETE_INDEXES = [
+        [("task_id", 1), ("month", -1)],
+        [("month", -1)]
+    ]
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.history_archive
+        self.state = db.history_archive_state
+    
+    async def create_indexes(self):
+        """Create indexes for the history_archive collection"""
+        await self.collection.create_indexes(self.INDEXES)
+    
+    async def find_by_ids(self, archive_ids: List[str]) -> Dict[str, dict]:
+        """Get archive documents by ID"""
+        cursor = self.collection.find({"_id": {"$in": archive_ids}})
+        return {document["_id"]: document async for document in cursor}
+    
+    async def save(self, documents: List[dict]):
+        """Insert or replace several archive documents in one bulk write"""
+        if documents:
+            await self.collection.bulk_write(
+                [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in documents],
+                ordered=False
+            )
+    
+    async def find_page(
+        self,
+        filters: Dict[str, Any],
+        limit: int,
+        before: Optional[Tuple[datetime, ObjectId]] = None
+    ) -> List[dict]:
+        """Get up to limit + 1 archived entries, newest first, with the history page filters
+        
+        Only documents whose time range overlaps the page are read, newest
+        last entry first, and the scan stops as soon as the next document
+        cannot hold anything newer than the entries already collected.
+        Decompression runs in the thread pool.
+        """
+        query: Dict[str, Any] = {}
+        if filters.get("task_id"):
+            query["task_id"] = filters["task_id"]
+        if filters.get("action"):
+            query["actions"] = filters["action"]
+        if filters.get("since"):
+            query["last_timestamp"] = {"$gte": filters["since"]}
+        if filters.get("until"):
+            query["first_timestamp"] = {"$lt": filters["until"]}
+        if before:
+            query.setdefault("first_timestamp", {})["$lte"] = before[0]
+        
+        def matches(entry: dict) -> bool:
+            if filters.get("action") and all(
+                item["action"] != filters["action"] for item in expand_entry(entry)
+            ):
+                return False
+            if filters.get("since") and entry["timestamp"] < filters["since"]:
+                return False
+            if filters.get("until") and entry["timestamp"] >= filters["until"]:
+                return False
+            return before is None or (entry["timestamp"], entry["_id"]) < before
+        
+        def matching_entries(document: dict) -> List[dict]:
+            return [entry for entry in unpack_entries(document) if matches(entry)]
+        
+        found: List[dict] = []
+        cursor = self.collection.find(query).sort("last_timestamp", -1)
+        async for document in cursor:
+            if len(found) > limit and found[limit]["timestamp"] > document["last_timestamp"]:
+                break
+            found.extend(await run_in_threadpool(matching_entries, document))
+            found.sort(key=lambda entry: (entry["timestamp"], entry["_id"]), reverse=True)
+            del found[limit + 1:]
+        
+        for entry in found:
+            entry["_id"] = str(entry["_id"])
+        return found
+    
+    async def iter_entries(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> AsyncIterator[dict]:
+        """Stream archived entries, optionally only those in a [since, until) range"""
+        query: Dict[str, Any] = {}
+        if since:
+            query["last_timestamp"] = {"$gte": since}
+        if until:
+            query["first_timestamp"] = {"$lt": until}
+        
+        async for document in self.collection.find(query):
+            for entry in await run_in_threadpool(unpack_entries, document):
+                if (since and entry["timestamp"] < since) or (until and entry["timestamp"] >= until):
+                    continue
+                yield entry
+    
+    async def get_watermark(self) -> Optional[datetime]:
+        """Moment every archived entry is older than (None if nothing was archived)"""
+        state = await self.state.find_one({"_id": _STATE_ID}, {"archived_before": 1})
+        return state.get("archived_before") if state else None
+    
+    async def set_watermark(self, archived_before: datetime):
+        """Record that entries older than a moment belong in the archive (moved or about to be)"""
+        await self.state.update_one(
+            {"_id": _STATE_ID},
+            {"$max": {"archived_before": archived_before}},
+            upsert=True
+        )
+    
+    async def acquire_lease(self, owner: str, until: datetime) -> bool:
+        """Take (or extend) the archiving lease unless another live owner holds it"""
+        now = datetime.utcnow()
+        try:
+            state = await self.state.find_one_and_update(
+                {"_id": _STATE_ID, "$or": [
+                    {"lease_owner": owner},
+                    {"lease_until": {"$lt": now}},
+                    {"lease_until": {"$exists": False}}
+                ]},
+                {"$set": {"lease_owner": owner, "lease_until": until}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The state exists and is leased by someone else
+            return False
+        return state is not None
+    
+    async def release_lease(self, owner: str):
+        """Give up the archiving lease"""
+        await self.state.update_one(
+            {"_id": _STATE_ID, "lease_owner": owner},
+            {"$unset": {"lease_owner": "", "lease_until": ""}}
+        )
@@ -1,20 +1,93 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
 from datetime import datetime
 from bson import ObjectId
+from pymongo import IndexModel
+from app.schemas.history import HistoryAction, FIELD_ACTIONS
+from app.utils.pagination import encode_cursor, keyset_filter
+
+
+def _history_value(value: Any) -> Optional[str]:
+    """Render a changed field value as the string shown in old_value / new_value"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(getattr(value, "value", value))
+
+
+def expand_entry(entry: dict) -> List[dict]:
+    """Per-action entries of a stored history document
+    
+    Updates are stored as one change-set document whose changes list holds a
+    {field, old, new} diff per changed field; each diff expands to an entry
+    with the field's action (UPDATED for fields without one of their own),
+    and an update that changed nothing to a single UPDATED entry. Other
+    documents already have the per-action shape and are returned as they are.
+    """
+    changes = entry.get("changes")
+    if changes is None:
+        return [entry]
+    
+    base = {key: value for key, value in entry.items() if key != "changes"}
+    if not changes:
+        return [{**base, "action": HistoryAction.UPDATED.value, "old_value": None, "new_value": None}]
+    
+    expanded = []
+    for change in changes:
+        item = {
+            **base,
+            "action": FIELD_ACTIONS.get(change["field"], HistoryAction.UPDATED).value,
+            "field": change["field"],
+            "old_value": _history_value(change.get("old")),
+            "new_value": _history_value(change.get("new"))
+        }
+        if "_id" in entry:
+            # Keep the IDs of entries expanded from one document distinct
+            item["_id"] = f"{entry['_id']}:{change['field']}"
+        expanded.append(item)
+    return expanded
+
+
+def action_query(action: str) -> Dict[str, Any]:
+    """Query matching the stored documents that expand to an entry with an action"""
+    fields = {field_action.value: field for field, field_action in FIELD_ACTIONS.items()}
+    if action in fields:
+        return {"$or": [{"action": action}, {"changes.field": fields[action]}]}
+    if action == HistoryAction.UPDATED.value:
+        return {"$or": [
+            {"action": action, "changes": {"$exists": False}},
+            {"changes": {"$size": 0}},
+            {"changes": {"$elemMatch": {"field": {"$nin": list(FIELD_ACTIONS)}}}}
+        ]}
+    return {"action": action}
 
 
 class HistoryRepository:
     """Repository for History/Audit log data operations"""
     
+    # History pages sort on (timestamp, _id); the per-task and global scans
+    # each have an index ending with that sort key
+    INDEXES = [
+        IndexModel([("task_id", 1), ("timestamp", -1), ("_id", -1)]),
+        IndexModel([("timestamp", -1), ("_id", -1)]),
+        # Activity reports per project / assignee over a time range
+        IndexModel([("project_id", 1), ("timestamp", 1)]),
+        IndexModel([("assigned_to", 1), ("timestamp", 1)])
+    ]
+    
+    # Superseded by the (timestamp, _id) indexes above; dropped on reconcile
+    OBSOLETE_INDEXES = [
+        [("task_id", 1), ("timestamp", -1)],
+        [("timestamp", 1)]
+    ]
+    
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.history
     
     async def create_indexes(self):
         """Create indexes for the history collection"""
-        await self.collection.create_index("task_id")
-        await self.collection.create_index("timestamp")
-        await self.collection.create_index([("task_id", 1), ("timestamp", -1)])
+        await self.collection.create_indexes(self.INDEXES)
     
     async def create(self, history_data: dict) -> dict:
         """Create a new history entry"""
@@ -23,24 +96,192 @@ class HistoryRepository:
         history_data["_id"] = str(result.inserted_id)
         return history_data
     
-    async def get_by_task(self, task_id: str) -> List[dict]:
-        """Get history entries for a specific task"""
+    def stamp(self, entries: List[dict]) -> None:
+        """Set the timestamp of entries that don't have one yet"""
+        now = datetime.utcnow()
+        for entry in entries:
+            entry.setdefault("timestamp", now)
+    
+    async def create_many(self, entries: List[dict]) -> List[dict]:
+        """Create several history entries in one batch"""
+        if not entries:
+            return entries
+        
+        self.stamp(entries)
+        await self.collection.insert_many(entries, ordered=False)
+        
+        for entry in entries:
+            entry["_id"] = str(entry["_id"])
+        return entries
+    
+    async def find_page(
+        self,
+        filters: Dict[str, Any],
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get a page of history entries, newest first
+        
+        Filters: task_id, action, since (inclusive) and until (exclusive).
+        Entries are returned as stored, see expand_entry for the API shape.
+        Pages continue from the (timestamp, _id) of the previous page's last
+        entry, so each one is a bounded index range scan however deep it is.
+        """
+        query: Dict[str, Any] = keyset_filter("timestamp", cursor)
+        if filters.get("task_id"):
+            query["task_id"] = filters["task_id"]
+        if filters.get("action"):
+            query["$and"] = [action_query(filters["action"])]
+        time_range = {}
+        if filters.get("since"):
+            time_range["$gte"] = filters["since"]
+        if filters.get("until"):
+            time_range["$lt"] = filters["until"]
+        if time_range:
+            query["timestamp"] = time_range
+        
         history = []
-        cursor = self.collection.find({"task_id": task_id}).sort("timestamp", -1)
+        # Fetch one entry past the page to know whether another page follows
+        cursor = self.collection.find(query).sort([("timestamp", -1), ("_id", -1)]).limit(limit + 1)
         async for entry in cursor:
             entry["_id"] = str(entry["_id"])
             history.append(entry)
-        return history
+        
+        next_cursor = None
+        if len(history) > limit:
+            history = history[:limit]
+            last = history[-1]
+            next_cursor = encode_cursor(last["timestamp"], last["_id"])
+        return history, next_cursor
     
     async def get_all(self, limit: int = 100) -> List[dict]:
         """Get all recent history entries"""
         history = []
-        cursor = self.collection.find({}).sort("timestamp", -1).limit(limit)
+        cursor = self.collection.find({}).sort([("timestamp", -1), ("_id", -1)]).limit(limit)
         async for entry in cursor:
             entry["_id"] = str(entry["_id"])
             history.append(entry)
         return history
     
+    async def aggregate_activity(
+        self,
+        start: datetime,
+        end: datetime,
+        unit: str,
+        project_id: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Activity counts per $dateTrunc bucket (day/week), optionally for one project or assignee
+        
+        Entries carry the project, assignee and status of their task at the
+        time of the event; entries written before that default to open tasks.
+        Status and assignee diffs of change-set documents are unwound into
+        per-action events first.
+        """
+        match: Dict[str, Any] = {"timestamp": {"$gte": start, "$lt": end}}
+        if project_id:
+            match["project_id"] = project_id
+        
+        is_open = {"$ne": [{"$ifNull": ["$status", "Pendiente"]}, "Completada"]}
+        completed = {"$and": [
+            {"$eq": ["$action", "STATUS_CHANGED"]},
+            {"$eq": ["$new_value", "Completada"]},
+            {"$ne": ["$old_value", "Completada"]}
+        ]}
+        
+        def when(condition: dict) -> dict:
+            return {"$sum": {"$cond": [condition, 1, 0]}}
+        
+        # Reassignments move open tasks between assignees, so they only count per user
+        moved_in = moved_out = {"$sum": 0}
+        own_event = {"$ne": ["$action", "ASSIGNED"]}
+        if user_id:
+            match["$or"] = [
+                {"assigned_to": user_id},
+                {"action": "ASSIGNED", "old_value": user_id},
+                {"changes": {"$elemMatch": {"field": "assigned_to", "old": user_id}}}
+            ]
+            moved_in = when({"$and": [
+                {"$eq": ["$action", "ASSIGNED"]}, {"$eq": ["$new_value", user_id]}, is_open
+            ]})
+            moved_out = when({"$and": [
+                {"$eq": ["$action", "ASSIGNED"]}, {"$eq": ["$old_value", user_id]}, is_open
+            ]})
+            own_event = {"$and": [own_event, {"$eq": ["$assigned_to", user_id]}]}
+        
+        pipeline = [
+            {"$match": match},
+            # One event per status / assignee diff of a change-set, the entry itself otherwise
+            {"$set": {"_events": {"$cond": [
+                {"$isArray": "$changes"},
+                {"$map": {
+                    "input": {"$filter": {
+                        "input": "$changes",
+                        "cond": {"$in": ["$$this.field", ["status", "assigned_to"]]}
+                    }},
+                    "in": {
+                        "action": {"$cond": [{"$eq": ["$$this.field", "status"]}, "STATUS_CHANGED", "ASSIGNED"]},
+                        "old_value": "$$this.old",
+                        "new_value": "$$this.new"
+                    }
+                }},
+                [{"action": "$action", "old_value": "$old_value", "new_value": "$new_value"}]
+            ]}}},
+            {"$unwind": "$_events"},
+            {"$set": {
+                "action": "$_events.action",
+                "old_value": "$_events.old_value",
+                "new_value": "$_events.new_value"
+            }},
+            {"$group": {
+                "_id": {"$dateTrunc": {"date": "$timestamp", "unit": unit, "startOfWeek": "monday"}},
+                "created": when({"$and": [own_event, {"$eq": ["$action", "CREATED"]}, is_open]}),
+                "completed": when({"$and": [own_event, completed]}),
+                "reopened": when({"$and": [
+                    own_event,
+                    {"$eq": ["$action", "STATUS_CHANGED"]},
+                    {"$eq": ["$old_value", "Completada"]},
+                    {"$ne": ["$new_value", "Completada"]}
+                ]}),
+                "deleted": when({"$and": [own_event, {"$eq": ["$action", "DELETED"]}, is_open]}),
+                "moved_in": moved_in,
+                "moved_out": moved_out,
+                # Tasks are created with their ObjectId, which embeds the creation time
+                "cycle_seconds": {"$sum": {"$cond": [
+                    {"$and": [own_event, completed]},
+                    {"$max": [0, {"$divide": [
+                        {"$subtract": ["$timestamp", {"$toDate": {"$convert": {
+                            "input": "$task_id", "to": "objectId", "onError": "$timestamp", "onNull": "$timestamp"
+                        }}}]},
+                        1000
+                    ]}]},
+                    0
+                ]}}
+            }},
+            {"$sort": {"_id": 1}},
+            {"$project": {
+                "_id": 0, "period": "$_id", "created": 1, "completed": 1, "reopened": 1,
+                "deleted": 1, "moved_in": 1, "moved_out": 1, "cycle_seconds": 1
+            }}
+        ]
+        
+        return [bucket async for bucket in self.collection.aggregate(pipeline)]
+    
+    async def iter_all(self) -> AsyncIterator[dict]:
+        """Stream every history entry in insertion order"""
+        async for entry in self.collection.find({}).sort("_id", 1):
+            yield entry
+    
+    async def find_older_than(self, cutoff: datetime, limit: int) -> List[dict]:
+        """Get the oldest entries written before a moment, with their raw ObjectIds"""
+        cursor = self.collection.find({"timestamp": {"$lt": cutoff}}).sort([("timestamp", 1), ("_id", 1)]).limit(limit)
+        return await cursor.to_list(length=limit)
+    
+    async def delete_by_ids(self, entry_ids: List[ObjectId]) -> int:
+        """Delete history entries by ID"""
+        result = await self.collection.delete_many({"_id": {"$in": entry_ids}})
+        return result.deleted_count
+    
     async def delete_by_task(self, task_id: str) -> bool:
         """Delete all history entries for a task"""
         result = await self.collection.delete_many({"task_id": task_id})
@@ -2,19 +2,24 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List
 from datetime import datetime
 from bson import ObjectId
+from pymongo import IndexModel
 
 
 class NotificationRepository:
     """Repository for Notification data operations"""
     
+    # Notifications are listed per user newest first, optionally unread only
+    INDEXES = [
+        IndexModel([("user_id", 1), ("created_at", -1)]),
+        IndexModel([("user_id", 1), ("read", 1), ("created_at", -1)])
+    ]
+    
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.notifications
     
     async def create_indexes(self):
         """Create indexes for the notifications collection"""
-        await self.collection.create_index("user_id")
-        await self.collection.create_index("read")
-        await self.collection.create_index("created_at")
+        await self.collection.create_indexes(self.INDEXES)
     
     async def create(self, notification_data: dict) -> dict:
         """Create a new notification"""
@@ -24,19 +29,42 @@ class NotificationRepository:
         notification_data["_id"] = str(result.inserted_id)
         return notification_data
     
-    async def get_by_user(self, user_id: str, unread_only: bool = False) -> List[dict]:
-        """Get notifications for a user"""
+    def stamp(self, notifications: List[dict]) -> None:
+        """Set the defaults of notifications that haven't been stamped yet"""
+        now = datetime.utcnow()
+        for notification in notifications:
+            notification.setdefault("read", False)
+            notification.setdefault("created_at", now)
+    
+    async def create_many(self, notifications: List[dict]) -> List[dict]:
+        """Create several notifications in one batch"""
+        if not notifications:
+            return notifications
+        
+        self.stamp(notifications)
+        await self.collection.insert_many(notifications, ordered=False)
+        
+        for notification in notifications:
+            notification["_id"] = str(notification["_id"])
+        return notifications
+    
+    async def get_by_user(self, user_id: str, unread_only: bool = False, limit: int = 0) -> List[dict]:
+        """Get notifications for a user, newest first (all of them unless limited)"""
         query = {"user_id": user_id}
         if unread_only:
             query["read"] = False
         
         notifications = []
-        cursor = self.collection.find(query).sort("created_at", -1)
+        cursor = self.collection.find(query).sort("created_at", -1).limit(limit)
         async for notification in cursor:
             notification["_id"] = str(notification["_id"])
             notifications.append(notification)
         return notifications
     
+    async def count_unread(self, user_id: str) -> int:
+        """Count the unread notifications of a user"""
+        return await self.collection.count_documents({"user_id": user_id, "read": False})
+    
     async def mark_as_read(self, notification_id: str) -> bool:
         """Mark a notification as read"""
         try:
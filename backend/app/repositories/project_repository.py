@@ -1,19 +1,24 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
+from typing import List, Optional, Dict
 from datetime import datetime
 from bson import ObjectId
+from pymongo import IndexModel
 
 
 class ProjectRepository:
     """Repository for Project data operations"""
     
+    INDEXES = [
+        IndexModel("name"),
+        IndexModel("created_by")
+    ]
+    
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.projects
     
     async def create_indexes(self):
         """Create indexes for the projects collection"""
-        await self.collection.create_index("name")
-        await self.collection.create_index("created_by")
+        await self.collection.create_indexes(self.INDEXES)
     
     async def create(self, project_data: dict) -> dict:
         """Create a new project"""
@@ -39,6 +44,23 @@ class ProjectRepository:
             project["_id"] = str(project["_id"])
         return project
     
+    async def find_ids_by_names(self, names: List[str]) -> Dict[str, str]:
+        """Map project names to IDs with one query"""
+        ids = {}
+        cursor = self.collection.find({"name": {"$in": names}}, {"name": 1})
+        async for project in cursor:
+            ids[project["name"]] = str(project["_id"])
+        return ids
+    
+    async def find_names_by_ids(self, ids: List[str]) -> Dict[str, str]:
+        """Map project IDs to names with one query"""
+        object_ids = [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+        names = {}
+        cursor = self.collection.find({"_id": {"$in": object_ids}}, {"name": 1})
+        async for project in cursor:
+            names[str(project["_id"])] = project["name"]
+        return names
+    
     async def get_all(self) -> List[dict]:
         """Get all projects"""
         projects = []
@@ -0,0 +1,53 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Optional
+from datetime import datetime
+from pymongo import IndexModel, ReturnDocument
+
+
+class RefreshTokenRepository:
+    """Repository for hashed refresh tokens"""
+    
+    # Tokens are looked up by hash and expire on their own
+    INDEXES = [
+        IndexModel("token_hash", unique=True),
+        IndexModel("family_id"),
+        IndexModel("expires_at", expireAfterSeconds=0)
+    ]
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.refresh_tokens
+    
+    async def create_indexes(self):
+        """Create indexes for the refresh_tokens collection"""
+        await self.collection.create_indexes(self.INDEXES)
+    
+    async def create(self, token_data: dict) -> dict:
+        """Store a new refresh token"""
+        token_data["created_at"] = datetime.utcnow()
+        token_data["used"] = False
+        result = await self.collection.insert_one(token_data)
+        token_data["_id"] = str(result.inserted_id)
+        return token_data
+    
+    async def consume(self, token_hash: str) -> Optional[dict]:
+        """Mark an unexpired token as used, returning it as it was before"""
+        token = await self.collection.find_one_and_update(
+            {"token_hash": token_hash, "expires_at": {"$gt": datetime.utcnow()}},
+            {"$set": {"used": True}},
+            return_document=ReturnDocument.BEFORE
+        )
+        if token:
+            token["_id"] = str(token["_id"])
+        return token
+    
+    async def find_by_hash(self, token_hash: str) -> Optional[dict]:
+        """Find a token by hash, used or not"""
+        token = await self.collection.find_one({"token_hash": token_hash})
+        if token:
+            token["_id"] = str(token["_id"])
+        return token
+    
+    async def delete_family(self, family_id: str) -> int:
+        """Delete every token descending from the same login"""
+        result = await self.collection.delete_many({"family_id": family_id})
+        return result.deleted_count
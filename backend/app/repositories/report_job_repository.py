@@ -0,0 +1,107 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket, AsyncIOMotorGridIn, AsyncIOMotorGridOut
+from typing import Any, Dict, Optional
+from datetime import datetime
+from bson import ObjectId
+from pymongo import IndexModel
+from gridfs.errors import NoFile
+
+
+# Unfinished job states
+_UNFINISHED = ["queued", "running"]
+
+
+class ReportJobRepository:
+    """Repository for asynchronous report jobs and their results
+    
+    Export files are stored in the report_files GridFS bucket, so they are
+    not bound by the document size limit; each file carries its expiry in
+    its metadata, since TTL indexes don't apply to GridFS.
+    """
+    
+    # Jobs and their results are dropped once they expire
+    INDEXES = [
+        IndexModel("expires_at", expireAfterSeconds=0),
+        IndexModel([("user_id", 1), ("created_at", -1)])
+    ]
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.report_jobs
+        self.files = AsyncIOMotorGridFSBucket(db, bucket_name="report_files")
+    
+    async def create_indexes(self):
+        """Create indexes for the report_jobs collection"""
+        await self.collection.create_indexes(self.INDEXES)
+    
+    async def create(self, job_data: dict) -> dict:
+        """Create a new job"""
+        job_data["created_at"] = datetime.utcnow()
+        result = await self.collection.insert_one(job_data)
+        job_data["_id"] = str(result.inserted_id)
+        return job_data
+    
+    async def find_by_id(self, job_id: str) -> Optional[dict]:
+        """Find a job by ID"""
+        try:
+            job = await self.collection.find_one({"_id": ObjectId(job_id)})
+            if job:
+                job["_id"] = str(job["_id"])
+            return job
+        except:
+            return None
+    
+    async def update(self, job_id: str, update_data: dict) -> bool:
+        """Update a job"""
+        result = await self.collection.update_one(
+            {"_id": ObjectId(job_id)},
+            {"$set": update_data}
+        )
+        return result.modified_count > 0
+    
+    async def fail_unfinished(self, worker_id: str, error: str) -> int:
+        """Fail the queued and running jobs owned by one worker process"""
+        result = await self.collection.update_many(
+            {"worker_id": worker_id, "status": {"$in": _UNFINISHED}},
+            {"$set": {"status": "failed", "error": error, "finished_at": datetime.utcnow()}}
+        )
+        return result.modified_count
+    
+    async def heartbeat(self, worker_id: str) -> int:
+        """Mark the unfinished jobs of a worker process as still owned"""
+        result = await self.collection.update_many(
+            {"worker_id": worker_id, "status": {"$in": _UNFINISHED}},
+            {"$set": {"heartbeat_at": datetime.utcnow()}}
+        )
+        return result.modified_count
+    
+    async def fail_stale(self, before: datetime, error: str) -> int:
+        """Fail the unfinished jobs whose worker process stopped sending heartbeats"""
+        result = await self.collection.update_many(
+            {"status": {"$in": _UNFINISHED}, "$or": [
+                {"heartbeat_at": {"$lt": before}},
+                {"heartbeat_at": {"$exists": False}}
+            ]},
+            {"$set": {"status": "failed", "error": error, "finished_at": datetime.utcnow()}}
+        )
+        return result.modified_count
+    
+    def open_file_upload(self, filename: str, metadata: Dict[str, Any]) -> AsyncIOMotorGridIn:
+        """Start writing a result file"""
+        return self.files.open_upload_stream(filename, metadata=metadata)
+    
+    async def open_file(self, file_id: ObjectId) -> Optional[AsyncIOMotorGridOut]:
+        """Open a result file for reading, None if it is gone"""
+        try:
+            return await self.files.open_download_stream(file_id)
+        except NoFile:
+            return None
+    
+    async def delete_expired_files(self, now: datetime) -> int:
+        """Delete the result files past their expiry"""
+        deleted = 0
+        async for grid_out in self.files.find({"metadata.expires_at": {"$lt": now}}):
+            try:
+                await self.files.delete(grid_out._id)
+                deleted += 1
+            except NoFile:
+                pass
+        return deleted
@@ -1,23 +1,44 @@
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
 from datetime import datetime
 from bson import ObjectId
+from pymongo import IndexModel, ReturnDocument
+from pymongo.errors import BulkWriteError
+from app.utils.pagination import encode_cursor, keyset_filter
+
+# Round trips a bulk update or delete keeps in flight at once
+_BULK_CONCURRENCY = 16
 
 
 class TaskRepository:
     """Repository for Task data operations"""
     
+    # Every list/search query sorts on (created_at, _id), so each filter field
+    # leads a compound index that ends with that sort key
+    INDEXES = [
+        IndexModel([("created_at", -1), ("_id", -1)]),
+        IndexModel([("status", 1), ("created_at", -1), ("_id", -1)]),
+        IndexModel([("priority", 1), ("created_at", -1), ("_id", -1)]),
+        IndexModel([("project_id", 1), ("created_at", -1), ("_id", -1)]),
+        IndexModel([("assigned_to", 1), ("created_at", -1), ("_id", -1)]),
+        IndexModel([("assigned_to", 1), ("status", 1), ("created_at", -1), ("_id", -1)]),
+        IndexModel("due_date"),
+        # Incremental refresh of the analytics snapshot
+        IndexModel("updated_at"),
+        IndexModel(
+            [("title", "text"), ("description", "text")],
+            weights={"title": 10, "description": 1},
+            default_language="spanish"
+        )
+    ]
+    
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.tasks
     
     async def create_indexes(self):
         """Create indexes for the tasks collection"""
-        await self.collection.create_index("status")
-        await self.collection.create_index("priority")
-        await self.collection.create_index("project_id")
-        await self.collection.create_index("assigned_to")
-        await self.collection.create_index("due_date")
-        await self.collection.create_index("created_at")
+        await self.collection.create_indexes(self.INDEXES)
     
     async def create(self, task_data: dict) -> dict:
         """Create a new task"""
@@ -27,6 +48,24 @@ class TaskRepository:
         task_data["_id"] = str(result.inserted_id)
         return task_data
     
+    async def create_many(self, tasks_data: List[dict]) -> Dict[int, str]:
+        """Create several tasks in one unordered batch, returning errors by position"""
+        now = datetime.utcnow()
+        for task_data in tasks_data:
+            task_data["created_at"] = now
+            task_data["updated_at"] = now
+        
+        errors = {}
+        try:
+            await self.collection.insert_many(tasks_data, ordered=False)
+        except BulkWriteError as e:
+            errors = {error["index"]: error["errmsg"] for error in e.details["writeErrors"]}
+        
+        # insert_many assigns the ObjectIds to the documents before sending them
+        for task_data in tasks_data:
+            task_data["_id"] = str(task_data["_id"])
+        return errors
+    
     async def find_by_id(self, task_id: str) -> Optional[dict]:
         """Find a task by ID"""
         try:
@@ -46,6 +85,34 @@ class TaskRepository:
             tasks.append(task)
         return tasks
     
+    async def iter_updated_since(
+        self, since: Optional[datetime], fields: List[str], batch_size: int
+    ) -> AsyncIterator[List[dict]]:
+        """Get some fields of every task updated at or after a moment (all tasks if None), a batch at a time
+        
+        IDs are left as ObjectId so callers can convert whole batches off the event loop.
+        """
+        query = {"updated_at": {"$gte": since}} if since else {}
+        cursor = self.collection.find(query, {field: 1 for field in fields}, batch_size=batch_size)
+        while True:
+            tasks = await cursor.to_list(length=batch_size)
+            if not tasks:
+                return
+            yield tasks
+    
+    async def iter_ids(self, batch_size: int) -> AsyncIterator[List[dict]]:
+        """Get the ID of every task as {"_id": ObjectId} documents, a batch at a time"""
+        cursor = self.collection.find({}, {"_id": 1}, batch_size=batch_size)
+        while True:
+            tasks = await cursor.to_list(length=batch_size)
+            if not tasks:
+                return
+            yield tasks
+    
+    async def count(self) -> int:
+        """Count every task"""
+        return await self.collection.count_documents({})
+    
     async def update(self, task_id: str, update_data: dict) -> bool:
         """Update a task"""
         try:
@@ -58,6 +125,65 @@ class TaskRepository:
         except:
             return False
     
+    async def update_returning_previous(self, task_id: str, update_data: dict) -> Optional[dict]:
+        """Update a task atomically and return the document as it was before the update"""
+        try:
+            update_data["updated_at"] = datetime.utcnow()
+            task = await self.collection.find_one_and_update(
+                {"_id": ObjectId(task_id)},
+                {"$set": update_data},
+                return_document=ReturnDocument.BEFORE
+            )
+            if task:
+                task["_id"] = str(task["_id"])
+            return task
+        except:
+            return None
+    
+    async def update_many_returning_previous(self, updates: List[Tuple[str, dict]]) -> List[Optional[dict]]:
+        """Apply several (task_id, update_data) pairs, returning each task as it was before its update
+        
+        Each update is an atomic find_one_and_update, like a single update,
+        so concurrent edits each get their own pre-image; None means the
+        task was not found. Updates of one task apply in order, different
+        tasks at most _BULK_CONCURRENCY at a time.
+        """
+        positions: Dict[str, List[int]] = {}
+        for position, (task_id, _) in enumerate(updates):
+            positions.setdefault(task_id, []).append(position)
+        
+        previous: List[Optional[dict]] = [None] * len(updates)
+        semaphore = asyncio.Semaphore(_BULK_CONCURRENCY)
+        
+        async def update_task(task_id: str):
+            async with semaphore:
+                for position in positions[task_id]:
+                    previous[position] = await self.update_returning_previous(task_id, updates[position][1])
+        
+        await asyncio.gather(*(update_task(task_id) for task_id in positions))
+        return previous
+    
+    async def delete_many_returning(self, task_ids: List[str]) -> Dict[str, dict]:
+        """Delete several tasks, returning the ones this call deleted keyed by ID
+        
+        Each task is removed with its own find_one_and_delete, at most
+        _BULK_CONCURRENCY at a time, so a task also deleted by a concurrent
+        request is returned to exactly one of them.
+        """
+        semaphore = asyncio.Semaphore(_BULK_CONCURRENCY)
+        
+        async def delete(object_id: ObjectId) -> Optional[dict]:
+            async with semaphore:
+                return await self.collection.find_one_and_delete({"_id": object_id})
+        
+        object_ids = [ObjectId(task_id) for task_id in dict.fromkeys(task_ids) if ObjectId.is_valid(task_id)]
+        deleted = {}
+        for task in await asyncio.gather(*(delete(object_id) for object_id in object_ids)):
+            if task:
+                task["_id"] = str(task["_id"])
+                deleted[task["_id"]] = task
+        return deleted
+    
     async def delete(self, task_id: str) -> bool:
         """Delete a task"""
         try:
@@ -66,16 +192,25 @@ class TaskRepository:
         except:
             return False
     
-    async def search(self, filters: Dict[str, Any]) -> List[dict]:
-        """Search tasks with filters"""
+    def _is_ranked(self, filters: Dict[str, Any]) -> bool:
+        """Whether the filters ask for a relevance-ranked full-text search"""
+        return bool(filters.get("text")) and filters.get("search_mode", "text") == "text"
+    
+    def _build_search_query(self, filters: Dict[str, Any]) -> dict:
+        """Translate search filters into a MongoDB query"""
         query = {}
         
         # Text search in title and description
         if "text" in filters and filters["text"]:
-            query["$or"] = [
-                {"title": {"$regex": filters["text"], "$options": "i"}},
-                {"description": {"$regex": filters["text"], "$options": "i"}}
-            ]
+            if self._is_ranked(filters):
+                # Served by the text index on title and description
+                query["$text"] = {"$search": filters["text"]}
+            else:
+                # Explicit regex fallback, always a collection scan
+                query["$or"] = [
+                    {"title": {"$regex": filters["text"], "$options": "i"}},
+                    {"description": {"$regex": filters["text"], "$options": "i"}}
+                ]
         
         # Filter by status
         if "status" in filters and filters["status"]:
@@ -93,13 +228,282 @@ class TaskRepository:
         if "assigned_to" in filters and filters["assigned_to"]:
             query["assigned_to"] = filters["assigned_to"]
         
+        return query
+    
+    def _search_pipeline(
+        self,
+        filters: Dict[str, Any],
+        limit: Optional[int],
+        cursor: Optional[str]
+    ) -> Tuple[List[dict], str]:
+        """Build the match/sort/limit stages of a page and return its sort key"""
+        query = self._build_search_query(filters)
+        
+        if self._is_ranked(filters):
+            # Rank by relevance; the keyset continues on (score, _id)
+            sort_field = "score"
+            pipeline = [
+                {"$match": query},
+                {"$addFields": {"score": {"$meta": "textScore"}}}
+            ]
+            keyset = keyset_filter(sort_field, cursor)
+            if keyset:
+                pipeline.append({"$match": keyset})
+        else:
+            # Newest first; the keyset continues on (created_at, _id)
+            sort_field = "created_at"
+            keyset = keyset_filter(sort_field, cursor)
+            if keyset:
+                query = {"$and": [query, keyset]} if query else keyset
+            pipeline = [{"$match": query}]
+        
+        # Fetch one extra document to know whether another page exists
+        pipeline.append({"$sort": {sort_field: -1, "_id": -1}})
+        if limit is not None:
+            pipeline.append({"$limit": limit + 1})
+        return pipeline, sort_field
+    
+    def _finish_page(
+        self,
+        tasks: List[dict],
+        limit: int,
+        sort_field: str
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Trim the look-ahead document and compute the next cursor"""
+        next_cursor = None
+        if len(tasks) > limit:
+            tasks = tasks[:limit]
+            last = tasks[-1]
+            next_cursor = encode_cursor(last[sort_field], last["_id"])
+        return tasks, next_cursor
+    
+    async def search(
+        self,
+        filters: Dict[str, Any],
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Search tasks with filters, one page at a time"""
+        pipeline, sort_field = self._search_pipeline(filters, limit, cursor)
+        
+        tasks = []
+        async for task in self.collection.aggregate(pipeline):
+            task["_id"] = str(task["_id"])
+            tasks.append(task)
+        
+        return self._finish_page(tasks, limit, sort_field)
+    
+    def _details_stages(self) -> List[dict]:
+        """Stages joining project and assignee names and projecting TaskWithDetails fields"""
+        return [
+            # References are stored as strings, the joined collections key on ObjectId
+            {"$addFields": {
+                "_project_oid": {"$convert": {
+                    "input": "$project_id", "to": "objectId", "onError": None, "onNull": None
+                }},
+                "_assignee_oid": {"$convert": {
+                    "input": "$assigned_to", "to": "objectId", "onError": None, "onNull": None
+                }}
+            }},
+            {"$lookup": {
+                "from": "projects",
+                "localField": "_project_oid",
+                "foreignField": "_id",
+                "pipeline": [{"$project": {"_id": 0, "name": 1}}],
+                "as": "_project"
+            }},
+            {"$lookup": {
+                "from": "users",
+                "localField": "_assignee_oid",
+                "foreignField": "_id",
+                "pipeline": [{"$project": {"_id": 0, "username": 1}}],
+                "as": "_assignee"
+            }},
+            {"$project": {
+                "title": 1,
+                "description": 1,
+                "status": 1,
+                "priority": 1,
+                "project_id": 1,
+                "assigned_to": 1,
+                "due_date": 1,
+                "estimated_hours": 1,
+                "created_at": 1,
+                "updated_at": 1,
+                "score": 1,
+                "project_name": {"$arrayElemAt": ["$_project.name", 0]},
+                "assigned_to_name": {"$arrayElemAt": ["$_assignee.username", 0]}
+            }}
+        ]
+    
+    async def search_with_details(
+        self,
+        filters: Dict[str, Any],
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Search tasks and join project and assignee names on the server"""
+        pipeline, sort_field = self._search_pipeline(filters, limit, cursor)
+        pipeline += self._details_stages()
+        
         tasks = []
-        cursor = self.collection.find(query)
+        async for task in self.collection.aggregate(pipeline):
+            task["_id"] = str(task["_id"])
+            tasks.append(task)
+        
+        return self._finish_page(tasks, limit, sort_field)
+    
+    async def stream_with_details(self, filters: Dict[str, Any]) -> AsyncIterator[dict]:
+        """Yield every matching task with details straight from the server cursor"""
+        pipeline, _ = self._search_pipeline(filters, None, None)
+        pipeline += self._details_stages()
+        
+        # Relevance-ranked exports sort every match, which may exceed the in-memory sort limit
+        async for task in self.collection.aggregate(pipeline, allowDiskUse=True):
+            task["_id"] = str(task["_id"])
+            yield task
+    
+    @staticmethod
+    def _statistics_group(now: datetime) -> dict:
+        """$group stage counting tasks by status, high priority and overdue"""
+        return {"$group": {
+            "_id": None,
+            "total": {"$sum": 1},
+            "completed": {"$sum": {"$cond": [{"$eq": ["$status", "Completada"]}, 1, 0]}},
+            "pending": {"$sum": {"$cond": [{"$eq": ["$status", "Pendiente"]}, 1, 0]}},
+            "in_progress": {"$sum": {"$cond": [{"$eq": ["$status", "En Progreso"]}, 1, 0]}},
+            "high_priority": {"$sum": {"$cond": [{"$in": ["$priority", ["Alta", "Crítica"]]}, 1, 0]}},
+            # Null sorts before dates, so require an actual date before comparing
+            "overdue": {"$sum": {"$cond": [{"$and": [
+                {"$eq": [{"$type": "$due_date"}, "date"]},
+                {"$lt": ["$due_date", now]},
+                {"$ne": ["$status", "Completada"]}
+            ]}, 1, 0]}}
+        }}
+    
+    async def get_statistics(self, now: datetime) -> Dict[str, int]:
+        """Count tasks by status, high priority and overdue in one pass"""
+        pipeline = [self._statistics_group(now), {"$project": {"_id": 0}}]
+        
+        async for stats in self.collection.aggregate(pipeline):
+            return stats
+        return {
+            "total": 0, "completed": 0, "pending": 0,
+            "in_progress": 0, "high_priority": 0, "overdue": 0
+        }
+    
+    async def get_overview(self, now: datetime) -> Dict[str, Any]:
+        """Statistics plus task counts by status, project ID and assignee ID in one $facet pass"""
+        def count_by(field: str) -> List[dict]:
+            return [
+                {"$match": {field: {"$nin": [None, ""]}}},
+                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}}
+            ]
+        
+        pipeline = [{"$facet": {
+            "stats": [self._statistics_group(now), {"$project": {"_id": 0}}],
+            "by_status": [{"$group": {"_id": {"$ifNull": ["$status", "Unknown"]}, "count": {"$sum": 1}}}],
+            "by_project": count_by("project_id"),
+            "by_assignee": count_by("assigned_to")
+        }}]
+        
+        facets = (await self.collection.aggregate(pipeline).to_list(1))[0]
+        stats = facets["stats"][0] if facets["stats"] else {
+            "total": 0, "completed": 0, "pending": 0,
+            "in_progress": 0, "high_priority": 0, "overdue": 0
+        }
+        return {
+            "stats": stats,
+            "by_status": {group["_id"]: group["count"] for group in facets["by_status"]},
+            "by_project": {group["_id"]: group["count"] for group in facets["by_project"]},
+            "by_assignee": {group["_id"]: group["count"] for group in facets["by_assignee"]}
+        }
+    
+    async def find_open_by_assignee(self, user_id: str, limit: int = 20) -> List[dict]:
+        """Get the most recent unfinished tasks assigned to a user"""
+        tasks = []
+        cursor = self.collection.find({
+            "assigned_to": user_id,
+            "status": {"$in": ["Pendiente", "En Progreso"]}
+        }).sort([("created_at", -1), ("_id", -1)]).limit(limit)
         async for task in cursor:
             task["_id"] = str(task["_id"])
             tasks.append(task)
         return tasks
     
+    async def count_overdue(self, now: datetime) -> int:
+        """Count unfinished tasks past their due date (served by the due_date index)"""
+        return await self.collection.count_documents({
+            "due_date": {"$lt": now},
+            "status": {"$ne": "Completada"}
+        })
+    
+    async def count_by_dimension(self) -> AsyncIterator[Tuple[str, dict]]:
+        """Yield (dimension, group) counts per (status, priority): global, per project, per assignee"""
+        # Separate streamed aggregations rather than one $facet, whose single
+        # result document would be capped at 16MB with many projects and users
+        for dimension, reference in (("global", None), ("project", "project_id"), ("assignee", "assigned_to")):
+            group_key = {"status": "$status", "priority": "$priority"}
+            pipeline = []
+            if reference:
+                group_key["ref"] = f"${reference}"
+                pipeline.append({"$match": {reference: {"$nin": [None, ""]}}})
+            pipeline.append({"$group": {"_id": group_key, "count": {"$sum": 1}}})
+            
+            async for group in self.collection.aggregate(pipeline, allowDiskUse=True):
+                yield dimension, group
+    
+    async def count_by_status(self) -> Dict[str, int]:
+        """Count tasks grouped by status"""
+        pipeline = [
+            {"$group": {"_id": {"$ifNull": ["$status", "Unknown"]}, "count": {"$sum": 1}}}
+        ]
+        
+        counts = {}
+        async for group in self.collection.aggregate(pipeline):
+            counts[group["_id"]] = group["count"]
+        return counts
+    
+    async def _count_by_reference(
+        self,
+        field: str,
+        collection: str,
+        name_field: str,
+        label: str
+    ) -> List[Dict[str, Any]]:
+        """Count tasks per referenced document, labelled with the referenced name"""
+        pipeline = [
+            {"$match": {field: {"$nin": [None, ""]}}},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            # Only one lookup per distinct reference, after grouping
+            {"$lookup": {
+                "from": collection,
+                "let": {"ref": {"$convert": {
+                    "input": "$_id", "to": "objectId", "onError": None, "onNull": None
+                }}},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$ref"]}}},
+                    {"$project": {"_id": 0, name_field: 1}}
+                ],
+                "as": "_ref"
+            }},
+            {"$group": {
+                "_id": {"$ifNull": [{"$arrayElemAt": [f"$_ref.{name_field}", 0]}, "Unknown"]},
+                "count": {"$sum": "$count"}
+            }},
+            {"$project": {"_id": 0, label: "$_id", "count": 1}}
+        ]
+        
+        return [group async for group in self.collection.aggregate(pipeline)]
+    
+    async def count_by_project(self) -> List[Dict[str, Any]]:
+        """Count tasks grouped by project name"""
+        return await self._count_by_reference("project_id", "projects", "name", "project")
+    
+    async def count_by_assignee(self) -> List[Dict[str, Any]]:
+        """Count tasks grouped by assignee username"""
+        return await self._count_by_reference("assigned_to", "users", "username", "user")
+    
     async def get_by_project(self, project_id: str) -> List[dict]:
         """Get all tasks for a project"""
         tasks = []
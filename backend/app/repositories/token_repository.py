@@ -0,0 +1,37 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Set
+from datetime import datetime
+from pymongo import IndexModel
+
+
+class RevokedTokenRepository:
+    """Repository for revoked access token IDs (JTIs)"""
+    
+    # Entries expire together with the token they revoke
+    INDEXES = [
+        IndexModel("jti", unique=True),
+        IndexModel("expires_at", expireAfterSeconds=0)
+    ]
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.revoked_tokens
+    
+    async def create_indexes(self):
+        """Create indexes for the revoked_tokens collection"""
+        await self.collection.create_indexes(self.INDEXES)
+    
+    async def revoke(self, jti: str, expires_at: datetime):
+        """Revoke a token until it expires"""
+        await self.collection.update_one(
+            {"jti": jti},
+            {"$setOnInsert": {"jti": jti, "expires_at": expires_at}},
+            upsert=True
+        )
+    
+    async def get_active_jtis(self) -> Set[str]:
+        """Get the IDs of every revoked token that has not expired yet"""
+        jtis = set()
+        cursor = self.collection.find({"expires_at": {"$gt": datetime.utcnow()}}, {"jti": 1})
+        async for entry in cursor:
+            jtis.add(entry["jti"])
+        return jtis
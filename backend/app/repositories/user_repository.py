@@ -1,19 +1,49 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
+from typing import List, Optional, Dict
 from datetime import datetime
 from bson import ObjectId
+from pymongo import IndexModel, ReturnDocument
+from app.config import settings
+from app.utils.cache import TTLCache
+
+# User documents keyed by ("id", _id) and ("username", username); both keys are
+# always stored together so either lookup can invalidate the other
+user_cache = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+def _cache_user(user: dict):
+    """Store a user document under both of its keys"""
+    user_cache.set(("id", user["_id"]), user)
+    user_cache.set(("username", user["username"]), user)
+
+
+def _invalidate_user(user_id: str, *usernames: Optional[str]):
+    """Drop a cached user document under its ID and every username it may be cached under
+    
+    Called after the write, with the usernames read from the database, so a
+    lookup racing the write cannot leave the old document cached.
+    """
+    cached = user_cache.peek(("id", user_id))
+    user_cache.delete(("id", user_id))
+    for username in {*usernames, cached and cached["username"]}:
+        if username:
+            user_cache.delete(("username", username))
 
 
 class UserRepository:
     """Repository for User data operations"""
     
+    INDEXES = [
+        IndexModel("username", unique=True),
+        IndexModel("email", unique=True)
+    ]
+    
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.users
     
     async def create_indexes(self):
         """Create indexes for the users collection"""
-        await self.collection.create_index("username", unique=True)
-        await self.collection.create_index("email", unique=True)
+        await self.collection.create_indexes(self.INDEXES)
     
     async def create(self, user_data: dict) -> dict:
         """Create a new user"""
@@ -23,18 +53,28 @@ class UserRepository:
         return user_data
     
     async def find_by_username(self, username: str) -> Optional[dict]:
-        """Find a user by username"""
+        """Find a user by username (cached)"""
+        cached = user_cache.get(("username", username))
+        if cached:
+            return dict(cached)
+        
         user = await self.collection.find_one({"username": username})
         if user:
             user["_id"] = str(user["_id"])
+            _cache_user(dict(user))
         return user
     
     async def find_by_id(self, user_id: str) -> Optional[dict]:
-        """Find a user by ID"""
+        """Find a user by ID (cached)"""
+        cached = user_cache.get(("id", user_id))
+        if cached:
+            return dict(cached)
+        
         try:
             user = await self.collection.find_one({"_id": ObjectId(user_id)})
             if user:
                 user["_id"] = str(user["_id"])
+                _cache_user(dict(user))
             return user
         except:
             return None
@@ -46,6 +86,23 @@ class UserRepository:
             user["_id"] = str(user["_id"])
         return user
     
+    async def find_ids_by_usernames(self, usernames: List[str]) -> Dict[str, str]:
+        """Map usernames to IDs with one query"""
+        ids = {}
+        cursor = self.collection.find({"username": {"$in": usernames}}, {"username": 1})
+        async for user in cursor:
+            ids[user["username"]] = str(user["_id"])
+        return ids
+    
+    async def find_names_by_ids(self, ids: List[str]) -> Dict[str, str]:
+        """Map user IDs to usernames with one query"""
+        object_ids = [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+        names = {}
+        cursor = self.collection.find({"_id": {"$in": object_ids}}, {"username": 1})
+        async for user in cursor:
+            names[str(user["_id"])] = user["username"]
+        return names
+    
     async def get_all(self) -> List[dict]:
         """Get all users"""
         users = []
@@ -58,18 +115,25 @@ class UserRepository:
     async def update(self, user_id: str, update_data: dict) -> bool:
         """Update a user"""
         try:
-            result = await self.collection.update_one(
+            before = await self.collection.find_one_and_update(
                 {"_id": ObjectId(user_id)},
-                {"$set": update_data}
+                {"$set": update_data},
+                projection={"username": 1},
+                return_document=ReturnDocument.BEFORE
             )
-            return result.modified_count > 0
         except:
             return False
+        _invalidate_user(user_id, before and before["username"], update_data.get("username"))
+        return before is not None
     
     async def delete(self, user_id: str) -> bool:
         """Delete a user"""
         try:
-            result = await self.collection.delete_one({"_id": ObjectId(user_id)})
-            return result.deleted_count > 0
+            deleted = await self.collection.find_one_and_delete(
+                {"_id": ObjectId(user_id)},
+                projection={"username": 1}
+            )
         except:
             return False
+        _invalidate_user(user_id, deleted and deleted["username"])
+        return deleted is not None
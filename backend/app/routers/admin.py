@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.database import get_database
+from app.services.index_service import IndexService
+from app.services.counter_service import CounterService
+from app.services.activity_service import ActivityService
+from app.schemas.index import IndexInfo
+from app.routers.auth import get_current_admin
+from app.repositories.user_repository import user_cache
+from app.services.report_cache import report_cache
+from app.services.task_snapshot import task_snapshot
+from app.services.report_jobs import report_jobs
+from app.services.history_retention import history_retention
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Any, Dict, List
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+
+@router.get("/indexes", response_model=List[IndexInfo])
+async def get_index_report(
+    current_user: dict = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Report live and declared indexes, flagging unused and redundant ones"""
+    index_service = IndexService(db)
+    report = await index_service.report()
+    return report
+
+
+@router.post("/indexes/reconcile", response_model=Dict[str, Dict[str, Any]])
+async def reconcile_indexes(
+    current_user: dict = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Create every declared index that is missing and drop the obsolete ones"""
+    index_service = IndexService(db)
+    result = await index_service.reconcile()
+    return result
+
+
+@router.get("/cache", response_model=Dict[str, Dict[str, Any]])
+async def get_cache_stats(current_user: dict = Depends(get_current_admin)):
+    """Report the state of the in-process caches and background queues"""
+    return {
+        "users": user_cache.stats(),
+        "reports": report_cache.stats(),
+        "task_snapshot": task_snapshot.stats(),
+        "report_jobs": report_jobs.stats(),
+        "history_retention": history_retention.stats()
+    }
+
+
+@router.post("/counters/rebuild", response_model=Dict[str, Any])
+async def rebuild_counters(
+    current_user: dict = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Recompute the task counters from the tasks, reporting any drift found"""
+    counter_service = CounterService(db)
+    result = await counter_service.rebuild()
+    return result
+
+
+@router.post("/activity/rebuild", response_model=Dict[str, Any])
+async def rebuild_activity_rollup(
+    current_user: dict = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Recompute the daily activity rollup by replaying the history"""
+    activity_service = ActivityService(db)
+    try:
+        result = await activity_service.rebuild()
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return result
+
+
+@router.post("/history/archive", response_model=Dict[str, Any])
+async def archive_history(
+    current_user: dict = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Move history older than the retention window into the archive now"""
+    try:
+        result = await history_retention.archive(db)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return result
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from app.config import settings
 from app.database import get_database
 from app.services.auth_service import AuthService
-from app.schemas.user import User, UserCreate
-from app.utils.security import decode_access_token
+from app.schemas.user import User, UserCreate, RefreshRequest, LogoutRequest
+from app.utils.security import decode_access_token, HashingPoolBusy
+from app.services.token_revocation import revocation_list
+from app.utils.rate_limit import TokenBucketLimiter
+from app.repositories.user_repository import UserRepository
+from datetime import datetime
+import math
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import Optional
 
@@ -11,6 +17,19 @@ router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Login attempts are throttled before any bcrypt work happens (a zero or
+# negative LOGIN_*_PER_MINUTE or LOGIN_*_BURST fails at startup)
+login_ip_limiter = TokenBucketLimiter(
+    settings.LOGIN_IP_BURST,
+    settings.LOGIN_IP_PER_MINUTE / 60,
+    settings.LOGIN_LIMITER_MAX_KEYS
+)
+login_username_limiter = TokenBucketLimiter(
+    settings.LOGIN_USERNAME_BURST,
+    settings.LOGIN_USERNAME_PER_MINUTE / 60,
+    settings.LOGIN_LIMITER_MAX_KEYS
+)
+
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
@@ -26,13 +45,24 @@ async def get_current_user(
         )
     
     username: str = payload.get("sub")
-    if username is None:
+    if username is None or revocation_list.is_revoked(payload.get("jti")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Stateless mode builds the user from the token claims (older tokens lack them)
+    if settings.AUTH_STATELESS and all(
+        payload.get(claim) for claim in ("user_id", "email", "created_at")
+    ):
+        return {
+            "_id": payload["user_id"],
+            "username": username,
+            "email": payload["email"],
+            "created_at": datetime.fromisoformat(payload["created_at"])
+        }
+    
     auth_service = AuthService(db)
     user = await auth_service.get_current_user(username)
     if user is None:
@@ -45,15 +75,56 @@ async def get_current_user(
     return user
 
 
+async def get_current_admin(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> dict:
+    """Dependency to require an authenticated administrator
+    
+    Admin rights come from the is_admin flag stored on the user, which only
+    scripts/set_admin.py sets; the user is loaded even in stateless mode,
+    whose token claims don't carry it.
+    """
+    user = await UserRepository(db).find_by_id(current_user["_id"])
+    if not user or not user.get("is_admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    
+    return current_user
+
+
 @router.post("/login")
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Login endpoint - returns access token"""
+    # Per-IP bucket first, so a blocked client doesn't drain the username's bucket.
+    # Behind a proxy, uvicorn resolves the client from X-Forwarded-For, trusting only FORWARDED_ALLOW_IPS
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = login_ip_limiter.acquire(client_ip)
+    if not retry_after:
+        retry_after = login_username_limiter.acquire(form_data.username.lower())
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    
     auth_service = AuthService(db)
     
-    user = await auth_service.authenticate_user(form_data.username, form_data.password)
+    try:
+        user = await auth_service.authenticate_user(form_data.username, form_data.password)
+    except HashingPoolBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -62,9 +133,11 @@ async def login(
         )
     
     access_token = await auth_service.create_token(user)
+    refresh_token = await auth_service.create_refresh_token(user)
     
     return {
         "access_token": access_token,
+        "refresh_token": refresh_token,
         "token_type": "bearer",
         "user": {
             "id": user["_id"],
@@ -85,6 +158,12 @@ async def register(
     try:
         user = await auth_service.register_user(user_data)
         return user
+    except HashingPoolBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -92,6 +171,47 @@ async def register(
         )
 
 
+@router.post("/refresh")
+async def refresh(
+    refresh_data: RefreshRequest,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Exchange a refresh token for a new access token (the refresh token rotates)"""
+    auth_service = AuthService(db)
+    
+    tokens = await auth_service.refresh_tokens(refresh_data.refresh_token)
+    if not tokens:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    access_token, refresh_token = tokens
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+
+@router.post("/logout")
+async def logout(
+    logout_data: Optional[LogoutRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Revoke the current access token and, if given, the refresh token's whole login"""
+    payload = decode_access_token(token)
+    auth_service = AuthService(db)
+    await auth_service.logout(
+        payload, current_user["_id"], logout_data.refresh_token if logout_data else None
+    )
+    
+    return {"message": "Logged out successfully"}
+
+
 @router.get("/me", response_model=User)
 async def get_me(current_user: dict = Depends(get_current_user)):
     """Get current user information"""
@@ -1,33 +1,78 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from app.database import get_database
 from app.services.history_service import HistoryService
-from app.schemas.history import History
+from app.schemas.history import HistoryAction, HistoryPage
 from app.routers.auth import get_current_user
+from app.utils.dates import to_naive_utc
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List
+from datetime import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/api/history", tags=["History"])
 
 
-@router.get("/task/{task_id}", response_model=List[History])
+def _history_filters(
+    action: Optional[HistoryAction],
+    since: Optional[datetime],
+    until: Optional[datetime]
+) -> dict:
+    """Collect the history query parameters that were provided into a filters dict"""
+    filters = {}
+    if action:
+        filters["action"] = action.value
+    if since:
+        filters["since"] = to_naive_utc(since)
+    if until:
+        filters["until"] = to_naive_utc(until)
+    return filters
+
+
+@router.get("/task/{task_id}", response_model=HistoryPage)
 async def get_task_history(
     task_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    action: Optional[HistoryAction] = Query(None),
+    since: Optional[datetime] = Query(None, description="Entries at or after this moment"),
+    until: Optional[datetime] = Query(None, description="Entries before this moment"),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Get history entries for a specific task"""
+    """Get a page of history entries for a specific task, newest first"""
     history_service = HistoryService(db)
-    history = await history_service.get_task_history(task_id)
-    return history
+    filters = _history_filters(action, since, until)
+    
+    try:
+        history, next_cursor = await history_service.get_task_history(task_id, filters, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return {"items": history, "next_cursor": next_cursor}
 
 
-@router.get("", response_model=List[History])
+@router.get("", response_model=HistoryPage)
 async def get_all_history(
-    limit: int = Query(100, le=500),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    action: Optional[HistoryAction] = Query(None),
+    since: Optional[datetime] = Query(None, description="Entries at or after this moment"),
+    until: Optional[datetime] = Query(None, description="Entries before this moment"),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Get all recent history entries"""
+    """Get a page of history entries across all tasks, newest first"""
     history_service = HistoryService(db)
-    history = await history_service.get_all_history(limit)
-    return history
+    filters = _history_filters(action, since, until)
+    
+    try:
+        history, next_cursor = await history_service.get_history(filters, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return {"items": history, "next_cursor": next_cursor}
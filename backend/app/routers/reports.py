@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from app.database import get_database
 from app.services.stats_service import StatsService
-from app.repositories.user_repository import UserRepository
+from app.services.activity_service import ActivityService
+from app.services.dashboard_service import DashboardService
+from app.services.report_cache import report_cache
+from app.services.report_jobs import report_jobs, ReportQueueFull
+from app.repositories.report_job_repository import ReportJobRepository
+from app.schemas.report import ActivityReport, AnalyticsReport, Dashboard, ReportJob, ReportJobCreate
+from app.schemas.task import TaskStatus, TaskPriority
 from app.routers.auth import get_current_user
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import Dict, Any, List
+from app.utils.dates import to_naive_utc
+from datetime import datetime, timedelta
+import zlib
+from typing import Dict, Any, List, Optional, AsyncIterator
 
 router = APIRouter(prefix="/api/reports", tags=["Reports"])
 
@@ -16,10 +27,21 @@ async def get_statistics(
 ):
     """Get comprehensive task statistics"""
     stats_service = StatsService(db)
-    stats = await stats_service.get_task_statistics()
+    stats = await report_cache.get_or_compute(("stats",), stats_service.get_task_statistics)
     return stats
 
 
+@router.get("/dashboard", response_model=Dashboard)
+async def get_dashboard(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get the dashboard in one request: stats, breakdowns, users and the caller's own queues"""
+    dashboard_service = DashboardService(db)
+    dashboard = await dashboard_service.get_dashboard(current_user["_id"])
+    return dashboard
+
+
 @router.get("/generate", response_model=Dict[str, Any])
 async def generate_report(
     report_type: str = Query(..., description="Type of report: tasks, projects, users"),
@@ -29,20 +51,86 @@ async def generate_report(
     """Generate a report based on type"""
     stats_service = StatsService(db)
     
-    if report_type == "tasks":
-        data = await stats_service.get_tasks_by_status()
-        return {"type": "tasks", "data": data}
+    generators = {
+        "tasks": stats_service.get_tasks_by_status,
+        "projects": stats_service.get_tasks_by_project,
+        "users": stats_service.get_tasks_by_user
+    }
     
-    elif report_type == "projects":
-        data = await stats_service.get_tasks_by_project()
-        return {"type": "projects", "data": data}
+    if report_type not in generators:
+        return {"error": "Invalid report type"}
     
-    elif report_type == "users":
-        data = await stats_service.get_tasks_by_user()
-        return {"type": "users", "data": data}
+    data = await report_cache.get_or_compute(("generate", report_type), generators[report_type])
+    return {"type": report_type, "data": data}
+
+
+@router.get("/activity", response_model=ActivityReport)
+async def get_activity_report(
+    scope: str = Query("global", pattern="^(global|project|user)$"),
+    id: Optional[str] = Query(None, description="Project ID or user ID for project/user scopes"),
+    unit: str = Query("day", pattern="^(day|week)$"),
+    start: Optional[datetime] = Query(None, description="Defaults to 30 days before end"),
+    end: Optional[datetime] = Query(None, description="Defaults to now"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get throughput, cycle time and burndown per day or week, overall or for a project or user"""
+    if scope != "global" and not id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"An id is required for the {scope} scope"
+        )
     
-    else:
-        return {"error": "Invalid report type"}
+    # Open-ended ranges share a cache entry while it lives
+    cache_key = ("activity", scope, id, unit, start, end)
+    
+    # Buckets are UTC, compare naive UTC datetimes as stored
+    end = to_naive_utc(end) or datetime.utcnow()
+    start = to_naive_utc(start) or end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+    
+    activity_service = ActivityService(db)
+    try:
+        return await report_cache.get_or_compute(
+            cache_key,
+            lambda: activity_service.get_activity(scope, id, unit, start, end)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/analytics", response_model=AnalyticsReport)
+async def get_analytics(
+    status: Optional[TaskStatus] = None,
+    priority: Optional[TaskPriority] = None,
+    project_id: Optional[str] = None,
+    assigned_to: Optional[str] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    overdue: bool = False,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Ad-hoc task analytics: counts, estimated hours and priority x status matrix for any filter"""
+    filters = {
+        "status": status,
+        "priority": priority,
+        "project_id": project_id,
+        "assigned_to": assigned_to,
+        "due_from": to_naive_utc(due_from),
+        "due_to": to_naive_utc(due_to),
+        "overdue": overdue
+    }
+    
+    stats_service = StatsService(db)
+    return await stats_service.get_analytics(filters)
 
 
 @router.get("/users", response_model=List[Dict[str, str]])
@@ -51,10 +139,105 @@ async def get_users_list(
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Get list of all users for dropdowns"""
-    user_repo = UserRepository(db)
-    users = await user_repo.get_all()
+    stats_service = StatsService(db)
+    return await report_cache.get_or_compute(("users",), stats_service.get_user_list)
+
+
+def _job_response(job: dict) -> dict:
+    """Job document as returned by the API, pointing to the download for file results"""
+    if job.get("filename"):
+        job["download_url"] = f"/api/reports/jobs/{job['_id']}/download"
+    return job
+
+
+@router.post("/jobs", response_model=ReportJob, status_code=status.HTTP_202_ACCEPTED)
+async def create_report_job(
+    job_data: ReportJobCreate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Queue a report to run in the background; poll GET /jobs/{id} for its result"""
+    try:
+        job = await report_jobs.submit(job_data.type, job_data.params, current_user["_id"])
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except ReportQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "30"}
+        )
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJob)
+async def get_report_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get the status of a report job, and its result once completed"""
+    job_repo = ReportJobRepository(db)
+    job = await job_repo.find_by_id(job_id)
+    
+    if not job or job["user_id"] != current_user["_id"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report job not found"
+        )
+    return _job_response(job)
+
+
+async def _file_chunks(grid_out, decompress: bool) -> AsyncIterator[bytes]:
+    """Stream a stored gzip file chunk by chunk, optionally decompressed"""
+    # The file is a series of gzip members, each needing its own decompressor
+    decoder = zlib.decompressobj(zlib.MAX_WBITS | 16) if decompress else None
+    while True:
+        chunk = await grid_out.readchunk()
+        if not chunk:
+            break
+        if decoder is None:
+            yield chunk
+            continue
+        while chunk:
+            yield await run_in_threadpool(decoder.decompress, chunk)
+            chunk = b""
+            if decoder.eof:
+                chunk = decoder.unused_data
+                decoder = zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_report_job(
+    job_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Download the file produced by a completed export job"""
+    job_repo = ReportJobRepository(db)
+    job = await job_repo.find_by_id(job_id)
+    grid_out = None
+    if job and job["user_id"] == current_user["_id"] and job.get("result_file_id"):
+        grid_out = await job_repo.open_file(job["result_file_id"])
+    
+    if grid_out is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report file not found"
+        )
+    
+    headers = {"Content-Disposition": f'attachment; filename="{job["filename"]}"'}
     
-    return [
-        {"id": user["_id"], "username": user["username"]}
-        for user in users
-    ]
+    # The file is stored gzipped: pass it through to clients that accept gzip
+    gzipped = "gzip" in request.headers.get("accept-encoding", "")
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        headers["Content-Length"] = str(grid_out.length)
+    return StreamingResponse(
+        _file_chunks(grid_out, decompress=not gzipped),
+        media_type=job["media_type"],
+        headers=headers
+    )
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from app.database import get_database
 from app.services.task_service import TaskService
-from app.schemas.task import Task, TaskCreate, TaskUpdate, TaskWithDetails
+from app.schemas.task import (
+    Task, TaskCreate, TaskUpdate, TaskPage, TaskUpdateResponse,
+    TaskBulkCreate, TaskBulkUpdate, TaskBulkDelete, BulkResult, TaskImportResult
+)
 from app.routers.auth import get_current_user
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List, Optional
@@ -9,6 +13,40 @@ from typing import List, Optional
 router = APIRouter(prefix="/api/tasks", tags=["Tasks"])
 
 
+def _bulk_response(results: List[dict]) -> dict:
+    """Wrap per-item results with success and failure counts"""
+    succeeded = sum(1 for result in results if result["success"])
+    return {
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+
+
+def _search_filters(
+    text: Optional[str],
+    search_mode: str,
+    status: Optional[str],
+    priority: Optional[str],
+    project_id: Optional[str],
+    assigned_to: Optional[str]
+) -> dict:
+    """Collect the search query parameters that were provided into a filters dict"""
+    filters = {}
+    if text:
+        filters["text"] = text
+        filters["search_mode"] = search_mode
+    if status:
+        filters["status"] = status
+    if priority:
+        filters["priority"] = priority
+    if project_id:
+        filters["project_id"] = project_id
+    if assigned_to:
+        filters["assigned_to"] = assigned_to
+    return filters
+
+
 @router.post("", response_model=Task, status_code=status.HTTP_201_CREATED)
 async def create_task(
     task_data: TaskCreate,
@@ -21,44 +59,134 @@ async def create_task(
     return task
 
 
-@router.get("", response_model=List[TaskWithDetails])
+@router.get("", response_model=TaskPage)
 async def get_all_tasks(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Get all tasks with details"""
+    """Get a page of tasks with details"""
     task_service = TaskService(db)
-    tasks = await task_service.get_tasks_with_details()
-    return tasks
+    
+    try:
+        tasks, next_cursor = await task_service.get_tasks_with_details(limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return {"items": tasks, "next_cursor": next_cursor}
 
 
-@router.get("/search", response_model=List[dict])
+@router.get("/search", response_model=TaskPage)
 async def search_tasks(
     text: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     priority: Optional[str] = Query(None),
     project_id: Optional[str] = Query(None),
     assigned_to: Optional[str] = Query(None),
+    search_mode: str = Query("text", pattern="^(text|regex)$"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Search tasks with filters"""
     task_service = TaskService(db)
     
-    filters = {}
-    if text:
-        filters["text"] = text
-    if status:
-        filters["status"] = status
-    if priority:
-        filters["priority"] = priority
-    if project_id:
-        filters["project_id"] = project_id
-    if assigned_to:
-        filters["assigned_to"] = assigned_to
+    filters = _search_filters(text, search_mode, status, priority, project_id, assigned_to)
+    
+    try:
+        tasks, next_cursor = await task_service.search_tasks(filters, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
     
-    tasks = await task_service.search_tasks(filters)
-    return tasks
+    return {"items": tasks, "next_cursor": next_cursor}
+
+
+@router.get("/export")
+async def export_tasks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    text: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    priority: Optional[str] = Query(None),
+    project_id: Optional[str] = Query(None),
+    assigned_to: Optional[str] = Query(None),
+    search_mode: str = Query("text", pattern="^(text|regex)$"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Stream every matching task as NDJSON or CSV"""
+    task_service = TaskService(db)
+    filters = _search_filters(text, search_mode, status, priority, project_id, assigned_to)
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        task_service.export_tasks(filters, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'}
+    )
+
+
+@router.post("/import", response_model=TaskImportResult)
+async def import_tasks(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    notify: bool = Query(False, description="Notify assignees of imported tasks"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Import tasks from an NDJSON or CSV file"""
+    task_service = TaskService(db)
+    
+    # Default to the file extension when no format is given
+    if not format:
+        format = "csv" if (file.filename or "").lower().endswith(".csv") else "ndjson"
+    
+    result = await task_service.import_tasks(file.file, format, current_user["_id"], notify)
+    return result
+
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_tasks(
+    bulk_data: TaskBulkCreate,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Create many tasks at once"""
+    task_service = TaskService(db)
+    results = await task_service.bulk_create_tasks(bulk_data.items, current_user["_id"])
+    return _bulk_response(results)
+
+
+@router.put("/bulk", response_model=BulkResult)
+async def bulk_update_tasks(
+    bulk_data: TaskBulkUpdate,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Update many tasks at once"""
+    task_service = TaskService(db)
+    items = [item.model_dump() for item in bulk_data.items]
+    results = await task_service.bulk_update_tasks(items, current_user["_id"])
+    return _bulk_response(results)
+
+
+@router.delete("/bulk", response_model=BulkResult)
+async def bulk_delete_tasks(
+    bulk_data: TaskBulkDelete,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Delete many tasks at once"""
+    task_service = TaskService(db)
+    results = await task_service.bulk_delete_tasks(bulk_data.ids, current_user["_id"])
+    return _bulk_response(results)
 
 
 @router.get("/{task_id}", response_model=Task)
@@ -80,7 +208,7 @@ async def get_task(
     return task
 
 
-@router.put("/{task_id}", response_model=dict)
+@router.put("/{task_id}", response_model=TaskUpdateResponse)
 async def update_task(
     task_id: str,
     task_data: TaskUpdate,
@@ -89,15 +217,15 @@ async def update_task(
 ):
     """Update a task"""
     task_service = TaskService(db)
-    success = await task_service.update_task(task_id, task_data, current_user["_id"])
+    task = await task_service.update_task(task_id, task_data, current_user["_id"])
     
-    if not success:
+    if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found or no changes made"
         )
     
-    return {"message": "Task updated successfully"}
+    return {"message": "Task updated successfully", "task": task}
 
 
 @router.delete("/{task_id}", response_model=dict)
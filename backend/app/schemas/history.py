@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -15,6 +15,16 @@ class HistoryAction(str, Enum):
     DELETED = "DELETED"
 
 
+# Task fields whose changes have their own action; changes to any other
+# field are reported as UPDATED
+FIELD_ACTIONS = {
+    "status": HistoryAction.STATUS_CHANGED,
+    "title": HistoryAction.TITLE_CHANGED,
+    "priority": HistoryAction.PRIORITY_CHANGED,
+    "assigned_to": HistoryAction.ASSIGNED
+}
+
+
 class HistoryBase(BaseModel):
     """Base history schema"""
     action: HistoryAction
@@ -33,8 +43,15 @@ class History(HistoryBase):
     id: str = Field(alias="_id")
     task_id: str
     user_id: str
+    field: Optional[str] = None  # Changed task field, on entries expanded from an update
     username: str  # Joined from user
     timestamp: datetime
     
     class Config:
         populate_by_name = True
+
+
+class HistoryPage(BaseModel):
+    """A page of history entries plus the opaque cursor for the next page"""
+    items: List[History]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional, List, Any
+from datetime import datetime
+
+
+class IndexInfo(BaseModel):
+    """Index report entry for the admin API"""
+    collection: str
+    name: str
+    key: List[List[Any]]
+    declared: bool  # Declared by a repository's INDEXES
+    missing: bool  # Declared but not built yet
+    ops: Optional[int] = None  # Accesses since `since`, None when $indexStats is unavailable
+    since: Optional[datetime] = None
+    unused: Optional[bool] = None
+    redundant_with: Optional[str] = None  # Index whose key this one prefixes
@@ -0,0 +1,139 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any, Literal
+from datetime import datetime
+from enum import Enum
+from app.schemas.task import Task, TaskStatus, TaskPriority
+from app.schemas.notification import Notification
+from app.schemas.history import History
+
+
+class ActivityBucket(BaseModel):
+    """Activity of one day or week"""
+    period: datetime  # Bucket start (UTC midnight, Mondays for weeks)
+    created: int
+    completed: int  # Throughput
+    reopened: int
+    opened: int  # Open tasks entering the scope: created, reopened or assigned in
+    closed: int  # Open tasks leaving the scope: completed, deleted or assigned away
+    avg_cycle_hours: Optional[float] = None  # Creation to completion, over the tasks completed
+    remaining: int  # Open tasks at the end of the bucket (burndown)
+
+
+class ActivityReport(BaseModel):
+    """Throughput, cycle time and burndown series for a scope"""
+    scope: str
+    id: Optional[str] = None
+    unit: str
+    start: datetime
+    end: datetime
+    source: str  # "rollup" or "history"
+    throughput: int
+    avg_cycle_hours: Optional[float] = None
+    buckets: List[ActivityBucket]
+
+
+class AnalyticsGroup(BaseModel):
+    """Tasks sharing one value of a field"""
+    key: Optional[str] = None  # None groups the tasks without a value
+    name: Optional[str] = None  # Project name or username, for project/assignee groups
+    count: int
+    estimated_hours: float
+
+
+class AnalyticsReport(BaseModel):
+    """Counts and groupings of the tasks matching an analytics query"""
+    count: int
+    estimated_hours: float
+    overdue: int
+    by_status: List[AnalyticsGroup]
+    by_priority: List[AnalyticsGroup]
+    matrix: Dict[str, Dict[str, int]]  # priority -> status -> count
+    by_project: List[AnalyticsGroup]
+    by_assignee: List[AnalyticsGroup]
+
+
+class ReportJobType(str, Enum):
+    """Reports that can run as background jobs"""
+    STATS = "stats"
+    TASKS = "tasks"
+    PROJECTS = "projects"
+    USERS = "users"
+    ACTIVITY = "activity"
+    ANALYTICS = "analytics"
+    EXPORT = "export"
+
+
+class ReportJobStatus(str, Enum):
+    """Report job lifecycle"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ActivityJobParams(BaseModel):
+    """Parameters of an activity report job (see GET /api/reports/activity)"""
+    scope: Literal["global", "project", "user"] = "global"
+    id: Optional[str] = None
+    unit: Literal["day", "week"] = "day"
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+
+class AnalyticsJobParams(BaseModel):
+    """Parameters of an analytics report job (see GET /api/reports/analytics)"""
+    status: Optional[TaskStatus] = None
+    priority: Optional[TaskPriority] = None
+    project_id: Optional[str] = None
+    assigned_to: Optional[str] = None
+    due_from: Optional[datetime] = None
+    due_to: Optional[datetime] = None
+    overdue: bool = False
+
+
+class ExportJobParams(BaseModel):
+    """Parameters of a task export job (see GET /api/tasks/export)"""
+    format: Literal["ndjson", "csv"] = "ndjson"
+    text: Optional[str] = None
+    search_mode: Literal["text", "regex"] = "text"
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    project_id: Optional[str] = None
+    assigned_to: Optional[str] = None
+
+
+class ReportJobCreate(BaseModel):
+    """Schema for enqueuing a report job"""
+    type: ReportJobType
+    params: Dict[str, Any] = {}
+
+
+class ReportJob(BaseModel):
+    """Report job schema for API responses"""
+    id: str = Field(alias="_id")
+    type: ReportJobType
+    params: Dict[str, Any]
+    status: ReportJobStatus
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: datetime
+    error: Optional[str] = None
+    result: Optional[Any] = None  # Report output, once completed (exports are downloaded instead)
+    download_url: Optional[str] = None
+    
+    class Config:
+        populate_by_name = True
+
+
+class Dashboard(BaseModel):
+    """Everything the dashboard shows on page load"""
+    stats: Dict[str, int]  # Same as GET /api/reports/stats
+    by_status: Dict[str, int]
+    by_project: List[Dict[str, Any]]
+    by_user: List[Dict[str, Any]]
+    users: List[Dict[str, str]]  # Same as GET /api/reports/users
+    my_open_tasks: List[Task]
+    unread_count: int
+    notifications: List[Notification]  # Latest unread ones
+    recent_history: List[History]
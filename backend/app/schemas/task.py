@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
 
@@ -62,3 +62,67 @@ class TaskWithDetails(Task):
     """Task schema with joined details (project name, user name)"""
     project_name: Optional[str] = None
     assigned_to_name: Optional[str] = None
+    score: Optional[float] = None  # Text search relevance, only on ranked searches
+
+
+class TaskUpdateResponse(BaseModel):
+    """Response for a task update, including the updated task"""
+    message: str
+    task: Task
+
+
+class TaskPage(BaseModel):
+    """A page of tasks plus the opaque cursor for the next page"""
+    items: List[TaskWithDetails]
+    next_cursor: Optional[str] = None
+
+
+class TaskBulkCreate(BaseModel):
+    """Schema for creating tasks in bulk (each item is validated as TaskCreate)"""
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=1000)
+
+
+class TaskBulkUpdateItem(BaseModel):
+    """A single update in a bulk request (changes are validated as TaskUpdate)"""
+    id: str
+    changes: Dict[str, Any]
+
+
+class TaskBulkUpdate(BaseModel):
+    """Schema for updating tasks in bulk"""
+    items: List[TaskBulkUpdateItem] = Field(..., min_length=1, max_length=1000)
+
+
+class TaskBulkDelete(BaseModel):
+    """Schema for deleting tasks in bulk"""
+    ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+
+class BulkItemResult(BaseModel):
+    """Outcome of one item of a bulk request"""
+    index: int
+    id: Optional[str] = None
+    success: bool
+    error: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    """Per-item outcomes of a bulk request"""
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+class ImportRowError(BaseModel):
+    """A rejected row of a task import"""
+    row: int
+    error: str
+
+
+class TaskImportResult(BaseModel):
+    """Summary of a task import"""
+    total_rows: int
+    imported: int
+    rejected: int
+    errors: List[ImportRowError]  # Capped at IMPORT_MAX_REPORTED_ERRORS entries
+    aborted: Optional[str] = None  # Set when the file could not be read to the end
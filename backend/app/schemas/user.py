@@ -37,3 +37,13 @@ class User(UserBase):
     
     class Config:
         populate_by_name = True
+
+
+class RefreshRequest(BaseModel):
+    """Schema for exchanging a refresh token"""
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    """Schema for logging out; the refresh token ends the whole login"""
+    refresh_token: Optional[str] = None
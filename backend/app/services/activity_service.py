@@ -0,0 +1,351 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError
+from app.repositories.history_repository import HistoryRepository, expand_entry
+from app.repositories.history_archive_repository import HistoryArchiveRepository
+from app.repositories.activity_repository import ActivityRollupRepository, ACTIVITY_FIELDS
+from app.services.counter_service import CounterService
+from app.services.history_retention import history_retention
+from app.services.report_cache import report_cache
+from bson import ObjectId
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+
+# Longest series a report may return
+MAX_BUCKETS = 400
+
+# History entries replayed per rollup write during a rebuild
+_REBUILD_BATCH_SIZE = 1000
+
+# Collection a rebuild is written to before it replaces history_daily
+_REBUILD_COLLECTION = "history_daily_rebuild"
+
+# How long before a rebuild starts an entry held back by it may have been inserted
+_HOLD_MARGIN = timedelta(minutes=5)
+
+
+class _RebuildFence:
+    """Live rollup updates held back while this process rebuilds the rollup"""
+    
+    def __init__(self):
+        self.held: Optional[List[dict]] = None
+    
+    @property
+    def active(self) -> bool:
+        """Whether a rebuild is running"""
+        return self.held is not None
+
+
+_fence = _RebuildFence()
+
+
+def _bucket_start(moment: datetime, unit: str) -> datetime:
+    """Start of the UTC day or week (Monday) containing a moment, as $dateTrunc computes it"""
+    day = datetime(moment.year, moment.month, moment.day)
+    if unit == "week":
+        day -= timedelta(days=day.weekday())
+    return day
+
+
+def _is_open(entry: dict) -> bool:
+    """Whether the entry's task was unfinished after the event"""
+    return (entry.get("status") or "Pendiente") != "Completada"
+
+
+def _cycle_seconds(entry: dict) -> float:
+    """Seconds from a task's creation (embedded in its ObjectId) to the entry"""
+    try:
+        created = ObjectId(entry["task_id"]).generation_time.replace(tzinfo=None)
+    except Exception:
+        return 0
+    return max(0, (entry["timestamp"] - created).total_seconds())
+
+
+def _activity_deltas(entries: Iterable[dict]) -> Dict[Tuple[str, datetime], Dict[str, float]]:
+    """Rollup increments per (scope, day) for a batch of stamped history entries"""
+    deltas: Dict[Tuple[str, datetime], Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+    for entry in (item for stored in entries for item in expand_entry(stored)):
+        day = _bucket_start(entry["timestamp"], "day")
+        action = entry["action"]
+        
+        if action == "ASSIGNED":
+            # Reassigning an open task moves it between assignees
+            if _is_open(entry):
+                if entry.get("old_value"):
+                    deltas[(f"assignee:{entry['old_value']}", day)]["moved_out"] += 1
+                if entry.get("new_value"):
+                    deltas[(f"assignee:{entry['new_value']}", day)]["moved_in"] += 1
+            continue
+        
+        changes: Dict[str, float] = {}
+        if action == "CREATED" and _is_open(entry):
+            changes["created"] = 1
+        elif action == "DELETED" and _is_open(entry):
+            changes["deleted"] = 1
+        elif action == "STATUS_CHANGED":
+            if entry.get("new_value") == "Completada" and entry.get("old_value") != "Completada":
+                changes["completed"] = 1
+                changes["cycle_seconds"] = _cycle_seconds(entry)
+            elif entry.get("old_value") == "Completada" and entry.get("new_value") != "Completada":
+                changes["reopened"] = 1
+        if not changes:
+            continue
+        
+        scopes = ["global"]
+        if entry.get("project_id"):
+            scopes.append(f"project:{entry['project_id']}")
+        if entry.get("assigned_to"):
+            scopes.append(f"assignee:{entry['assigned_to']}")
+        for scope in scopes:
+            for field, value in changes.items():
+                deltas[(scope, day)][field] += value
+    
+    return deltas
+
+
+class RolledUpHistoryWriter:
+    """Write-behind target that inserts history entries and then rolls them up
+    
+    Submitted to the write-behind queue in place of the history repository,
+    so the rollup follows the entries that were actually stored: on a
+    partial failure only the inserted entries are rolled up, and a retry
+    skips those already inserted (duplicate keys) instead of counting them
+    twice.
+    """
+    
+    def __init__(self, history_repo: HistoryRepository, activity_service: "ActivityService"):
+        self.history_repo = history_repo
+        self.activity_service = activity_service
+        self.collection = history_repo.collection
+    
+    def stamp(self, entries: List[dict]) -> None:
+        """Set the timestamp of entries that don't have one yet"""
+        self.history_repo.stamp(entries)
+    
+    async def create_many(self, entries: List[dict]) -> List[dict]:
+        """Insert a batch of history entries and roll up the ones stored"""
+        try:
+            await self.history_repo.create_many(entries)
+        except BulkWriteError as e:
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            await self._record([entry for index, entry in enumerate(entries) if index not in failed])
+            raise
+        await self._record(entries)
+        return entries
+    
+    async def _record(self, entries: List[dict]):
+        # A failed rollup update must not make the stored entries be retried
+        try:
+            await self.activity_service.record(entries)
+        except Exception as e:
+            print(f"Activity rollup update failed for {len(entries)} entries, rebuild it: {e}")
+            return
+        # Reports cached since the task write was invalidated still lack these entries
+        report_cache.invalidate()
+
+
+class ActivityService:
+    """Service for throughput, cycle time and burndown reports over the task history
+    
+    Reports read the daily rollup (history_daily), maintained incrementally
+    as history entries are written; until it has been built they aggregate
+    the history collection directly, plus the archive behind the retention
+    watermark. Project moves are not recorded in the history, so per-project
+    series only follow tasks that stay in a project.
+    """
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.history_repo = HistoryRepository(db)
+        self.archive_repo = HistoryArchiveRepository(db)
+        self.rollup_repo = ActivityRollupRepository(db)
+        self.counter_service = CounterService(db)
+    
+    def history_writer(self) -> RolledUpHistoryWriter:
+        """Write-behind target for history entries that also feeds the rollup"""
+        return RolledUpHistoryWriter(self.history_repo, self)
+    
+    async def record(self, entries: List[dict]):
+        """Add freshly written history entries to the daily rollup
+        
+        While a rebuild runs in this process the entries are held back and
+        applied once the rebuilt rollup is in place.
+        """
+        if _fence.active:
+            _fence.held.extend(entries)
+            return
+        await self.rollup_repo.apply(_activity_deltas(entries))
+    
+    async def is_initialized(self) -> bool:
+        """Whether the rollup has been built"""
+        return await self.rollup_repo.exists()
+    
+    async def rebuild(self) -> Dict[str, int]:
+        """Recompute the daily rollup by replaying the whole history, archived entries included
+        
+        The replay is written to a separate collection that replaces
+        history_daily only once complete, so reports keep reading the old
+        rollup meanwhile. Live updates are held back during the replay;
+        afterwards those whose entries the replay did not already see are
+        applied to the new rollup.
+        """
+        if _fence.active:
+            raise ValueError("The activity rollup is already being rebuilt")
+        _fence.held = []
+        
+        # Entries the replay sees that live updates may also have been held for
+        recent_after = ObjectId.from_datetime(datetime.utcnow() - _HOLD_MARGIN)
+        recent_ids = set()
+        
+        replayed = 0
+        try:
+            target = ActivityRollupRepository(self.db, _REBUILD_COLLECTION)
+            await target.reset()
+            
+            for entries in (self.archive_repo.iter_entries(), self.history_repo.iter_all()):
+                batch = []
+                async for entry in entries:
+                    batch.append(entry)
+                    if isinstance(entry["_id"], ObjectId) and entry["_id"] >= recent_after:
+                        recent_ids.add(str(entry["_id"]))
+                    if len(batch) >= _REBUILD_BATCH_SIZE:
+                        await target.apply(_activity_deltas(batch))
+                        replayed += len(batch)
+                        batch = []
+                if batch:
+                    await target.apply(_activity_deltas(batch))
+                    replayed += len(batch)
+            
+            await self.rollup_repo.replace_with(target)
+        except Exception:
+            # The old rollup stays in place, so it takes every held update
+            held, _fence.held = _fence.held, None
+            await self.rollup_repo.apply(_activity_deltas(held))
+            report_cache.invalidate()
+            raise
+        
+        held, _fence.held = _fence.held, None
+        await self.rollup_repo.apply(_activity_deltas(
+            entry for entry in held if str(entry["_id"]) not in recent_ids
+        ))
+        report_cache.invalidate()
+        return {"entries": replayed}
+    
+    async def get_activity(
+        self,
+        scope: str,
+        ref_id: Optional[str],
+        unit: str,
+        start: datetime,
+        end: datetime,
+        max_buckets: int = MAX_BUCKETS
+    ) -> Dict[str, Any]:
+        """Per-bucket throughput, cycle time and remaining open tasks for a scope"""
+        start = _bucket_start(start, unit)
+        step = timedelta(weeks=1) if unit == "week" else timedelta(days=1)
+        periods = []
+        period = start
+        while period < end:
+            periods.append(period)
+            period += step
+        if len(periods) > max_buckets:
+            raise ValueError(f"Range too long: at most {max_buckets} buckets")
+        
+        # Scan up to now so the burndown can be walked back from the live counters
+        scan_end = max(end, datetime.utcnow())
+        counter_key = {"global": "global", "project": f"project:{ref_id}", "user": f"assignee:{ref_id}"}[scope]
+        if await self.is_initialized():
+            source = "rollup"
+            buckets = await self.rollup_repo.aggregate(counter_key, start, scan_end, unit)
+        else:
+            source = "history"
+            buckets = await self.history_repo.aggregate_activity(
+                start, scan_end, unit,
+                project_id=ref_id if scope == "project" else None,
+                user_id=ref_id if scope == "user" else None
+            )
+            buckets = await self._add_archived(buckets, counter_key, start, scan_end, unit)
+        by_period = {bucket["period"]: bucket for bucket in buckets}
+        
+        counters = await self.counter_service.get(counter_key)
+        remaining = counters["total"] - counters["status"].get("Completada", 0)
+        
+        # Undo the net change of buckets after the range
+        for bucket in buckets:
+            if bucket["period"] >= end:
+                remaining -= self._net(bucket)
+        
+        series = []
+        for period in reversed(periods):
+            bucket = by_period.get(period) or {}
+            counts = {field: bucket.get(field, 0) for field in ACTIVITY_FIELDS}
+            series.append({
+                "period": period,
+                "created": counts["created"],
+                "completed": counts["completed"],
+                "reopened": counts["reopened"],
+                "opened": counts["created"] + counts["reopened"] + counts["moved_in"],
+                "closed": counts["completed"] + counts["deleted"] + counts["moved_out"],
+                "avg_cycle_hours": (
+                    counts["cycle_seconds"] / counts["completed"] / 3600 if counts["completed"] else None
+                ),
+                "remaining": max(0, remaining)
+            })
+            remaining -= self._net(counts)
+        series.reverse()
+        
+        completed = sum(bucket["completed"] for bucket in series)
+        cycle_seconds = sum(by_period[p]["cycle_seconds"] for p in periods if p in by_period)
+        return {
+            "scope": scope,
+            "id": ref_id,
+            "unit": unit,
+            "start": start,
+            "end": end,
+            "source": source,
+            "throughput": completed,
+            "avg_cycle_hours": cycle_seconds / completed / 3600 if completed else None,
+            "buckets": series
+        }
+    
+    async def _add_archived(
+        self,
+        buckets: List[Dict[str, Any]],
+        counter_key: str,
+        start: datetime,
+        end: datetime,
+        unit: str
+    ) -> List[Dict[str, Any]]:
+        """Add the archived part of a range to buckets aggregated from the history collection"""
+        watermark = await history_retention.get_watermark(self.db)
+        if not watermark or watermark <= start:
+            return buckets
+        
+        by_period = {bucket["period"]: bucket for bucket in buckets}
+        
+        def add(batch: List[dict]):
+            for (scope, day), fields in _activity_deltas(batch).items():
+                if scope != counter_key:
+                    continue
+                period = _bucket_start(day, unit)
+                bucket = by_period.setdefault(period, {"period": period, **{field: 0 for field in ACTIVITY_FIELDS}})
+                for field, value in fields.items():
+                    bucket[field] += value
+        
+        batch = []
+        async for entry in self.archive_repo.iter_entries(start, min(end, watermark)):
+            batch.append(entry)
+            if len(batch) >= _REBUILD_BATCH_SIZE:
+                add(batch)
+                batch = []
+        add(batch)
+        
+        return [by_period[period] for period in sorted(by_period)]
+    
+    @staticmethod
+    def _net(counts: dict) -> float:
+        """Change in open tasks over a bucket"""
+        return (
+            counts.get("created", 0) + counts.get("reopened", 0) + counts.get("moved_in", 0)
+            - counts.get("completed", 0) - counts.get("deleted", 0) - counts.get("moved_out", 0)
+        )
@@ -1,16 +1,26 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.repositories.user_repository import UserRepository
-from app.utils.security import verify_password, get_password_hash, create_access_token
+from app.repositories.refresh_token_repository import RefreshTokenRepository
+from app.utils.security import (
+    verify_password_async, get_password_hash_async, password_needs_rehash,
+    create_access_token, generate_refresh_token, hash_refresh_token, HashingPoolBusy
+)
+from app.config import settings
 from app.schemas.user import UserCreate, User
-from typing import Optional
-from datetime import timedelta
+from typing import Optional, Tuple
+from app.services.token_revocation import revocation_list
+from app.services.report_cache import report_cache
+from datetime import datetime, timedelta
+import uuid
 
 
 class AuthService:
     """Service for authentication operations"""
     
     def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
         self.user_repo = UserRepository(db)
+        self.refresh_token_repo = RefreshTokenRepository(db)
     
     async def authenticate_user(self, username: str, password: str) -> Optional[dict]:
         """Authenticate a user with username and password"""
@@ -18,19 +28,63 @@ class AuthService:
         if not user:
             return None
         
-        if not verify_password(password, user["hashed_password"]):
+        if not await verify_password_async(password, user["hashed_password"]):
             return None
         
+        # Transparently upgrade hashes made with a different work factor
+        if password_needs_rehash(user["hashed_password"]):
+            try:
+                hashed_password = await get_password_hash_async(password)
+                await self.user_repo.update(user["_id"], {"hashed_password": hashed_password})
+            except HashingPoolBusy:
+                pass  # Try again on a later login
+        
         return user
     
     async def create_token(self, user: dict) -> str:
         """Create an access token for a user"""
+        # Carry the claims routers use, so stateless mode can skip the user lookup
         token_data = {
             "sub": user["username"],
-            "user_id": user["_id"]
+            "user_id": user["_id"],
+            "email": user["email"],
+            "created_at": user["created_at"].isoformat()
         }
         return create_access_token(token_data)
     
+    async def create_refresh_token(self, user: dict, family_id: Optional[str] = None) -> str:
+        """Issue a refresh token; tokens rotated from the same login share a family"""
+        token = generate_refresh_token()
+        await self.refresh_token_repo.create({
+            "token_hash": hash_refresh_token(token),
+            "family_id": family_id or uuid.uuid4().hex,
+            # Only the owner: refreshing reloads the user, so renames and deletions apply
+            "user_id": user["_id"],
+            "expires_at": datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        })
+        return token
+    
+    async def refresh_tokens(self, refresh_token: str) -> Optional[Tuple[str, str]]:
+        """Exchange a refresh token for a new access token and a rotated refresh token"""
+        stored = await self.refresh_token_repo.consume(hash_refresh_token(refresh_token))
+        if not stored:
+            return None
+        
+        # A rotated token presented again means it leaked: end the whole login
+        if stored["used"]:
+            await self.refresh_token_repo.delete_family(stored["family_id"])
+            return None
+        
+        # The user may have been deleted (or renamed) since the login
+        user = await self.user_repo.find_by_id(stored["user_id"])
+        if not user:
+            await self.refresh_token_repo.delete_family(stored["family_id"])
+            return None
+        
+        access_token = await self.create_token(user)
+        new_refresh_token = await self.create_refresh_token(user, stored["family_id"])
+        return access_token, new_refresh_token
+    
     async def register_user(self, user_data: UserCreate) -> dict:
         """Register a new user"""
         # Check if user already exists
@@ -43,7 +97,7 @@ class AuthService:
             raise ValueError("Email already exists")
         
         # Hash password
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         
         # Create user
         user_dict = {
@@ -52,8 +106,26 @@ class AuthService:
             "hashed_password": hashed_password
         }
         
-        return await self.user_repo.create(user_dict)
+        user = await self.user_repo.create(user_dict)
+        report_cache.invalidate()
+        return user
     
     async def get_current_user(self, username: str) -> Optional[dict]:
         """Get current user by username"""
         return await self.user_repo.find_by_username(username)
+    
+    async def revoke_token(self, payload: dict):
+        """Revoke an access token until it expires"""
+        expires_at = datetime.utcfromtimestamp(payload["exp"])
+        await revocation_list.revoke(self.db, payload["jti"], expires_at)
+    
+    async def logout(self, payload: dict, user_id: str, refresh_token: Optional[str] = None):
+        """Revoke an access token and end the login its refresh token belongs to"""
+        if payload.get("jti"):
+            await self.revoke_token(payload)
+        
+        if refresh_token:
+            stored = await self.refresh_token_repo.find_by_hash(hash_refresh_token(refresh_token))
+            # Only the token owner may end its login
+            if stored and stored["user_id"] == user_id:
+                await self.refresh_token_repo.delete_family(stored["family_id"])
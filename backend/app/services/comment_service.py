@@ -1,6 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.repositories.comment_repository import CommentRepository
 from app.repositories.user_repository import UserRepository
+from app.services.user_loader import UsernameLoader
 from app.schemas.comment import CommentCreate
 from typing import List
 
@@ -11,6 +12,7 @@ class CommentService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.comment_repo = CommentRepository(db)
         self.user_repo = UserRepository(db)
+        self.usernames = UsernameLoader(self.user_repo)
     
     async def create_comment(self, comment_data: CommentCreate, user_id: str) -> dict:
         """Create a new comment"""
@@ -22,10 +24,4 @@ class CommentService:
     async def get_comments_by_task(self, task_id: str) -> List[dict]:
         """Get all comments for a task with user details"""
         comments = await self.comment_repo.get_by_task(task_id)
-        
-        # Enrich with user information
-        for comment in comments:
-            user = await self.user_repo.find_by_id(comment["user_id"])
-            comment["username"] = user["username"] if user else "Unknown"
-        
-        return comments
+        return await self.usernames.attach(comments)
@@ -0,0 +1,193 @@
+import asyncio
+from contextlib import asynccontextmanager
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.repositories.counter_repository import CounterRepository
+from app.repositories.task_repository import TaskRepository
+from collections import defaultdict
+from enum import Enum
+from typing import List, Dict, Any, Optional, Sequence, AsyncIterator
+
+
+def _counter_keys(task: dict) -> List[str]:
+    """Counter keys a task contributes to"""
+    keys = ["global"]
+    if task.get("project_id"):
+        keys.append(f"project:{task['project_id']}")
+    if task.get("assigned_to"):
+        keys.append(f"assignee:{task['assigned_to']}")
+    return keys
+
+
+def _label(value: Any) -> str:
+    """Counter field name for a status or priority (enum members use their value)"""
+    if isinstance(value, Enum):
+        value = value.value
+    return value or "Unknown"
+
+
+def _flatten(counter: Optional[dict]) -> Dict[str, int]:
+    """Counter document as dotted field paths (total, status.<s>, priority.<p>)"""
+    if not counter:
+        return {}
+    fields = {"total": counter.get("total", 0)}
+    for group in ("status", "priority"):
+        for name, count in (counter.get(group) or {}).items():
+            fields[f"{group}.{name}"] = count
+    return fields
+
+
+class CounterFence:
+    """Keeps task writes in this process out of a counter rebuild
+    
+    Each task write and its counter update run inside write(), concurrently
+    with each other. A rebuild runs inside exclusive(), which waits for the
+    writes in progress and holds new ones back until it is done, so every
+    write is either fully in the stored counters it reads and the scan, or
+    in neither.
+    """
+    
+    def __init__(self):
+        self._writers = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._open = asyncio.Event()
+        self._open.set()
+    
+    @asynccontextmanager
+    async def write(self) -> AsyncIterator[None]:
+        """Run a task write and its counter update"""
+        while not self._open.is_set():
+            await self._open.wait()
+        self._writers += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._writers -= 1
+            if not self._writers:
+                self._idle.set()
+    
+    @asynccontextmanager
+    async def exclusive(self) -> AsyncIterator[None]:
+        """Run a rebuild with no task write in progress"""
+        while not self._open.is_set():
+            await self._open.wait()
+        self._open.clear()
+        try:
+            await self._idle.wait()
+            yield
+        finally:
+            self._open.set()
+
+
+counter_fence = CounterFence()
+
+
+class CounterService:
+    """Service maintaining the materialized task counters behind dashboard stats"""
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.counter_repo = CounterRepository(db)
+        self.task_repo = TaskRepository(db)
+    
+    async def record(self, removed: Sequence[dict] = (), added: Sequence[dict] = ()):
+        """Move counters for tasks leaving (deleted, pre-update) and entering (created, post-update) the set"""
+        deltas: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for tasks, sign in ((removed, -1), (added, 1)):
+            for task in tasks:
+                status = _label(task.get("status"))
+                priority = _label(task.get("priority"))
+                for key in _counter_keys(task):
+                    deltas[key]["total"] += sign
+                    deltas[key][f"status.{status}"] += sign
+                    deltas[key][f"priority.{priority}"] += sign
+        
+        # Updates that don't touch counted fields cancel out and cost no write
+        changes = {
+            key: {field: delta for field, delta in fields.items() if delta}
+            for key, fields in deltas.items()
+        }
+        await self.counter_repo.apply({key: fields for key, fields in changes.items() if fields})
+    
+    async def get(self, key: str) -> Dict[str, Any]:
+        """Counters of one key, zeroed if it has none"""
+        counter = await self.counter_repo.get(key) or {}
+        return {
+            "total": counter.get("total", 0),
+            "status": counter.get("status", {}),
+            "priority": counter.get("priority", {})
+        }
+    
+    async def get_dimension(self, dimension: str) -> Dict[str, int]:
+        """Task totals per referenced ID of one dimension (project or assignee)"""
+        prefix = f"{dimension}:"
+        return {
+            counter["_id"][len(prefix):]: counter.get("total", 0)
+            for counter in await self.counter_repo.get_by_prefix(prefix)
+            if counter.get("total", 0) > 0
+        }
+    
+    async def get_overview(self) -> Optional[Dict[str, Any]]:
+        """Global counters plus totals per project and assignee from one query, None if not built yet"""
+        if not await self.is_initialized():
+            return None
+        counters = await self.counter_repo.get_all()
+        if "global" not in counters:
+            return None
+        
+        overview: Dict[str, Any] = {"global": counters["global"], "project": {}, "assignee": {}}
+        for key, counter in counters.items():
+            dimension, _, ref_id = key.partition(":")
+            if ref_id and dimension in overview and counter.get("total", 0) > 0:
+                overview[dimension][ref_id] = counter["total"]
+        return overview
+    
+    async def is_initialized(self) -> bool:
+        """Whether the counters have been built from the tasks at least once
+        
+        Live updates create counter documents too, so only the marker
+        written at the end of a rebuild counts.
+        """
+        return await self.counter_repo.is_built()
+    
+    async def rebuild(self) -> Dict[str, Any]:
+        """Recompute every counter from the tasks and report how far they had drifted
+        
+        Runs under the counter fence: task writes in this process wait until
+        it is done, so the stored counters and the scan see the same writes
+        and the corrections, applied as $inc deltas, count none of them
+        twice. The built marker is written last.
+        """
+        async with counter_fence.exclusive():
+            current = await self.counter_repo.get_all()
+            
+            fresh: Dict[str, dict] = {"global": {"total": 0, "status": {}, "priority": {}}}
+            async for dimension, group in self.task_repo.count_by_dimension():
+                key = dimension if dimension == "global" else f"{dimension}:{group['_id']['ref']}"
+                counter = fresh.setdefault(key, {"total": 0, "status": {}, "priority": {}})
+                status = group["_id"].get("status") or "Unknown"
+                priority = group["_id"].get("priority") or "Unknown"
+                counter["total"] += group["count"]
+                counter["status"][status] = counter["status"].get(status, 0) + group["count"]
+                counter["priority"][priority] = counter["priority"].get(priority, 0) + group["count"]
+            
+            drift = []
+            corrections: Dict[str, Dict[str, int]] = defaultdict(dict)
+            for key in sorted(set(fresh) | set(current)):
+                stored = _flatten(current.get(key))
+                expected = _flatten(fresh.get(key))
+                for field in sorted(set(stored) | set(expected)):
+                    if stored.get(field, 0) != expected.get(field, 0):
+                        corrections[key][field] = expected.get(field, 0) - stored.get(field, 0)
+                        drift.append({
+                            "key": key,
+                            "field": field,
+                            "stored": stored.get(field, 0),
+                            "actual": expected.get(field, 0)
+                        })
+            
+            # The global counter always exists once built, even with no tasks
+            corrections["global"].setdefault("total", 0)
+            await self.counter_repo.apply(corrections)
+            await self.counter_repo.mark_built()
+        return {"keys": len(fresh), "drift": drift}
@@ -0,0 +1,49 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.repositories.task_repository import TaskRepository
+from app.repositories.notification_repository import NotificationRepository
+from app.repositories.history_repository import HistoryRepository, expand_entry
+from app.repositories.user_repository import UserRepository
+from app.services.stats_service import StatsService
+from app.services.report_cache import report_cache
+from app.services.user_loader import UsernameLoader
+from typing import Dict, Any
+import asyncio
+
+# Sizes of the personal lists shown on the dashboard
+MY_OPEN_TASKS_LIMIT = 20
+UNREAD_NOTIFICATIONS_LIMIT = 50
+RECENT_HISTORY_LIMIT = 10
+
+
+class DashboardService:
+    """Service assembling everything the dashboard shows on page load"""
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.stats_service = StatsService(db)
+        self.task_repo = TaskRepository(db)
+        self.notification_repo = NotificationRepository(db)
+        self.history_repo = HistoryRepository(db)
+        self.usernames = UsernameLoader(UserRepository(db))
+    
+    async def get_dashboard(self, user_id: str) -> Dict[str, Any]:
+        """Organization-wide stats plus the user's own queues, fetched concurrently"""
+        overview, users, my_open_tasks, unread_count, notifications, history = await asyncio.gather(
+            # Shared by every user, so served from the report cache between writes
+            report_cache.get_or_compute(("overview",), self.stats_service.get_overview),
+            report_cache.get_or_compute(("users",), self.stats_service.get_user_list),
+            self.task_repo.find_open_by_assignee(user_id, MY_OPEN_TASKS_LIMIT),
+            self.notification_repo.count_unread(user_id),
+            self.notification_repo.get_by_user(user_id, unread_only=True, limit=UNREAD_NOTIFICATIONS_LIMIT),
+            self.history_repo.get_all(RECENT_HISTORY_LIMIT)
+        )
+        
+        history = await self.usernames.attach([item for entry in history for item in expand_entry(entry)])
+        
+        return {
+            **overview,
+            "users": users,
+            "my_open_tasks": my_open_tasks,
+            "unread_count": unread_count,
+            "notifications": notifications,
+            "recent_history": history
+        }
@@ -0,0 +1,163 @@
+import asyncio
+import time
+import uuid
+from collections import defaultdict
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.repositories.history_repository import HistoryRepository
+from app.repositories.history_archive_repository import (
+    HistoryArchiveRepository, archive_id, month_start, pack_entries, unpack_entries
+)
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+# How long a process may serve history pages from a stale watermark
+WATERMARK_TTL = timedelta(seconds=30)
+
+
+def _merge_into_archive(entries: List[dict], existing: Dict[str, dict]) -> List[dict]:
+    """Pack a batch of hot entries into archive documents, merged with the stored ones"""
+    groups: Dict[Tuple[str, datetime], Dict[Any, dict]] = defaultdict(dict)
+    for entry in entries:
+        groups[(entry["task_id"], month_start(entry["timestamp"]))][entry["_id"]] = entry
+    
+    documents = []
+    for (task_id, month), group in groups.items():
+        stored = existing.get(archive_id(task_id, month))
+        if stored:
+            # Entries archived by an interrupted run may come around again
+            for entry in unpack_entries(stored):
+                group.setdefault(entry["_id"], entry)
+        documents.append(pack_entries(task_id, month, list(group.values())))
+    return documents
+
+
+class HistoryRetention:
+    """Moves history older than the retention window into the compressed archive
+    
+    Runs every HISTORY_ARCHIVE_INTERVAL_HOURS, in one process at a time (a
+    lease in history_archive_state). Entries are archived oldest first in
+    batches: each batch is merged into its task-month archive documents and
+    only then deleted from history, so an interrupted run loses nothing.
+    HistoryService reads the archive for pages reaching behind the watermark,
+    which every process caches for WATERMARK_TTL; a run waits that long
+    after advancing it before deleting anything from history.
+    """
+    
+    def __init__(
+        self,
+        retention: timedelta = timedelta(days=settings.HISTORY_RETENTION_DAYS),
+        interval: timedelta = timedelta(hours=settings.HISTORY_ARCHIVE_INTERVAL_HOURS),
+        batch_size: int = settings.HISTORY_ARCHIVE_BATCH_SIZE
+    ):
+        self.retention = retention
+        self.interval = interval
+        self.batch_size = batch_size
+        self.owner = uuid.uuid4().hex
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._watermark: Optional[datetime] = None
+        self._watermark_read: Optional[float] = None
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether a retention window is configured"""
+        return self.retention > timedelta(0)
+    
+    def start(self, db: AsyncIOMotorDatabase):
+        """Start archiving periodically in the background"""
+        if self.enabled and (self._worker is None or self._worker.done()):
+            self._worker = asyncio.create_task(self._run(db))
+    
+    async def stop(self):
+        """Stop the background archiving"""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+    
+    async def _run(self, db: AsyncIOMotorDatabase):
+        """Archiving loop"""
+        while True:
+            try:
+                result = await self.archive(db)
+                if result["archived"]:
+                    print(f"Archived {result['archived']} history entries older than {result['cutoff']:%Y-%m-%d}")
+            except Exception as e:
+                print(f"History archiving failed: {e}")
+            await asyncio.sleep(self.interval.total_seconds())
+    
+    async def get_watermark(self, db: AsyncIOMotorDatabase) -> Optional[datetime]:
+        """Archive watermark, read from the database at most once per WATERMARK_TTL"""
+        now = time.monotonic()
+        if self._watermark_read is None or now - self._watermark_read >= WATERMARK_TTL.total_seconds():
+            self._watermark = await HistoryArchiveRepository(db).get_watermark()
+            self._watermark_read = now
+        return self._watermark
+    
+    async def archive(self, db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+        """Archive every history entry older than the retention window"""
+        if not self.enabled:
+            raise ValueError("History retention is disabled (HISTORY_RETENTION_DAYS=0)")
+        
+        history_repo = HistoryRepository(db)
+        archive_repo = HistoryArchiveRepository(db)
+        cutoff = datetime.utcnow() - self.retention
+        result = {"cutoff": cutoff, "archived": 0, "documents": 0, "skipped": False}
+        
+        # The lease outlives a run several times over; it is renewed every batch
+        lease = max(self.interval, timedelta(hours=1))
+        if not await archive_repo.acquire_lease(self.owner, datetime.utcnow() + lease):
+            result["skipped"] = True
+            return result
+        
+        try:
+            # Advanced first: from here on, readers look in the archive for
+            # anything older than the cutoff, whether or not it has moved yet
+            await archive_repo.set_watermark(cutoff)
+            self._watermark = max(self._watermark or cutoff, cutoff)
+            self._watermark_read = time.monotonic()
+            published = self._watermark_read
+            
+            while True:
+                entries = await history_repo.find_older_than(cutoff, self.batch_size)
+                if not entries:
+                    break
+                
+                # Let every process's cached watermark catch up before entries move
+                wait = WATERMARK_TTL.total_seconds() - (time.monotonic() - published)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                
+                existing = await archive_repo.find_by_ids(list({
+                    archive_id(entry["task_id"], month_start(entry["timestamp"])) for entry in entries
+                }))
+                # Compression is CPU-bound, keep it off the event loop
+                documents = await run_in_threadpool(_merge_into_archive, entries, existing)
+                await archive_repo.save(documents)
+                await history_repo.delete_by_ids([entry["_id"] for entry in entries])
+                
+                result["archived"] += len(entries)
+                result["documents"] += len(documents)
+                await archive_repo.acquire_lease(self.owner, datetime.utcnow() + lease)
+        finally:
+            await archive_repo.release_lease(self.owner)
+        
+        self.last_run = {**result, "finished_at": datetime.utcnow()}
+        return result
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retention settings and the outcome of the last run in this process"""
+        return {
+            "retention_days": self.retention.days,
+            "interval_hours": self.interval.total_seconds() / 3600,
+            "running": self._worker is not None and not self._worker.done(),
+            "last_run": self.last_run
+        }
+
+
+history_retention = HistoryRetention()
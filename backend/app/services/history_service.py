@@ -1,34 +1,65 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from app.repositories.history_repository import HistoryRepository
+from app.repositories.history_repository import HistoryRepository, expand_entry
+from app.repositories.history_archive_repository import HistoryArchiveRepository
 from app.repositories.user_repository import UserRepository
-from typing import List
+from app.services.user_loader import UsernameLoader
+from app.services.history_retention import history_retention
+from app.utils.pagination import decode_cursor, encode_cursor
+from typing import List, Optional, Dict, Any, Tuple
 
 
 class HistoryService:
     """Service for history/audit log business logic"""
     
     def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
         self.history_repo = HistoryRepository(db)
+        self.archive_repo = HistoryArchiveRepository(db)
         self.user_repo = UserRepository(db)
+        self.usernames = UsernameLoader(self.user_repo)
     
-    async def get_task_history(self, task_id: str) -> List[dict]:
-        """Get history for a specific task with user details"""
-        history = await self.history_repo.get_by_task(task_id)
-        
-        # Enrich with user information
-        for entry in history:
-            user = await self.user_repo.find_by_id(entry["user_id"])
-            entry["username"] = user["username"] if user else "Unknown"
-        
-        return history
+    async def get_task_history(
+        self,
+        task_id: str,
+        filters: Dict[str, Any],
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get a page of history for a specific task with user details"""
+        return await self.get_history({**filters, "task_id": task_id}, limit, cursor)
     
-    async def get_all_history(self, limit: int = 100) -> List[dict]:
-        """Get all recent history entries with user details"""
-        history = await self.history_repo.get_all(limit)
+    async def get_history(
+        self,
+        filters: Dict[str, Any],
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get a page of history entries, newest first, with user details
+        
+        Pages reaching behind the retention watermark are completed from the
+        archive, so archived periods read like any other. Limits and cursors
+        count stored documents; update change-sets expand to one entry per
+        changed field.
+        """
+        before = decode_cursor(cursor) if cursor else None
+        history, next_cursor = await self.history_repo.find_page(filters, limit, cursor)
         
-        # Enrich with user information
-        for entry in history:
-            user = await self.user_repo.find_by_id(entry["user_id"])
-            entry["username"] = user["username"] if user else "Unknown"
+        watermark = await history_retention.get_watermark(self.db)
+        if watermark and (next_cursor is None or history[-1]["timestamp"] < watermark):
+            archived = await self.archive_repo.find_page(filters, limit, before)
+            
+            # Entries being archived may briefly exist in both collections
+            merged = {entry["_id"]: entry for entry in archived}
+            merged.update((entry["_id"], entry) for entry in history)
+            history = sorted(merged.values(), key=lambda entry: (entry["timestamp"], entry["_id"]), reverse=True)
+            
+            if len(history) > limit:
+                history = history[:limit]
+                next_cursor = encode_cursor(history[-1]["timestamp"], history[-1]["_id"])
         
-        return history
+        action = filters.get("action")
+        entries = [
+            item for entry in history for item in expand_entry(entry)
+            if not action or item["action"] == action
+        ]
+        return await self.usernames.attach(entries), next_cursor
@@ -0,0 +1,153 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorCollection
+from pymongo.errors import OperationFailure
+from app.repositories.user_repository import UserRepository
+from app.repositories.project_repository import ProjectRepository
+from app.repositories.task_repository import TaskRepository
+from app.repositories.comment_repository import CommentRepository
+from app.repositories.notification_repository import NotificationRepository
+from app.repositories.history_repository import HistoryRepository
+from app.repositories.history_archive_repository import HistoryArchiveRepository
+from app.repositories.token_repository import RevokedTokenRepository
+from app.repositories.refresh_token_repository import RefreshTokenRepository
+from app.repositories.activity_repository import ActivityRollupRepository
+from app.repositories.report_job_repository import ReportJobRepository
+from typing import List, Dict, Any, Optional, Tuple
+
+
+def _key_signature(index: dict) -> Tuple:
+    """Comparable signature of an index specification (declared or live)"""
+    key = list(index["key"].items())
+
+    # Live text indexes report their key as _fts/_ftsx, declared ones list the fields
+    if any(field == "_fts" or direction == "text" for field, direction in key):
+        fields = index.get("weights") or {f: 1 for f, d in key if d == "text"}
+        return ("text",) + tuple(sorted(fields))
+
+    return tuple((field, direction) for field, direction in key)
+
+
+def _is_prefix(shorter: Tuple, longer: Tuple) -> bool:
+    """Whether one plain index key is a strict prefix of another"""
+    return len(shorter) < len(longer) and longer[:len(shorter)] == shorter
+
+
+class IndexService:
+    """Index manager: reconciles the indexes declared by each repository with the live ones"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.repositories = [
+            UserRepository(db),
+            ProjectRepository(db),
+            TaskRepository(db),
+            CommentRepository(db),
+            NotificationRepository(db),
+            HistoryRepository(db),
+            HistoryArchiveRepository(db),
+            RevokedTokenRepository(db),
+            RefreshTokenRepository(db),
+            ActivityRollupRepository(db),
+            ReportJobRepository(db)
+        ]
+
+    async def _live_indexes(self, collection: AsyncIOMotorCollection) -> List[dict]:
+        """List the indexes that currently exist on a collection"""
+        indexes = []
+        async for index in collection.list_indexes():
+            indexes.append(dict(index))
+        return indexes
+
+    async def _index_usage(self, collection: AsyncIOMotorCollection) -> Optional[Dict[str, dict]]:
+        """Access counters per index name, or None if $indexStats is not permitted"""
+        try:
+            usage = {}
+            async for stat in collection.aggregate([{"$indexStats": {}}]):
+                usage[stat["name"]] = stat["accesses"]
+            return usage
+        except OperationFailure:
+            return None
+
+    async def reconcile(self) -> Dict[str, Dict[str, Any]]:
+        """Create every declared index that is missing and drop the obsolete ones
+
+        Repositories list the keys of indexes they no longer use in
+        OBSOLETE_INDEXES; those are dropped once every declared index exists.
+        A failure on one collection is reported under errors and the others
+        are still reconciled.
+        """
+        created = {}
+        dropped = {}
+        errors = {}
+
+        for repo in self.repositories:
+            name = repo.collection.name
+            try:
+                live = await self._live_indexes(repo.collection)
+                live_signatures = {_key_signature(index) for index in live}
+                missing = [
+                    model for model in repo.INDEXES
+                    if _key_signature(model.document) not in live_signatures
+                ]
+
+                if missing:
+                    # Builds don't hold an exclusive lock, reads and writes continue meanwhile
+                    created[name] = await repo.collection.create_indexes(missing)
+
+                obsolete = {tuple(key) for key in getattr(repo, "OBSOLETE_INDEXES", [])}
+                for index in live:
+                    if _key_signature(index) in obsolete:
+                        await repo.collection.drop_index(index["name"])
+                        dropped.setdefault(name, []).append(index["name"])
+            except Exception as e:
+                errors[name] = str(e)
+
+        return {"created": created, "dropped": dropped, "errors": errors}
+
+    async def report(self) -> List[Dict[str, Any]]:
+        """Describe every live and declared index with its usage and redundancy"""
+        report = []
+
+        for repo in self.repositories:
+            live = await self._live_indexes(repo.collection)
+            usage = await self._index_usage(repo.collection)
+            declared = {_key_signature(model.document) for model in repo.INDEXES}
+            live_signatures = set()
+
+            for index in live:
+                signature = _key_signature(index)
+                live_signatures.add(signature)
+                if index["name"] == "_id_":
+                    continue
+
+                # A non-unique plain index whose key prefixes another index is redundant
+                redundant_with = None
+                if signature[0] != "text" and not index.get("unique"):
+                    for other in live:
+                        other_signature = _key_signature(other)
+                        if other_signature[0] != "text" and _is_prefix(signature, other_signature):
+                            redundant_with = other["name"]
+                            break
+
+                accesses = usage.get(index["name"]) if usage is not None else None
+                report.append({
+                    "collection": repo.collection.name,
+                    "name": index["name"],
+                    "key": [[field, direction] for field, direction in index["key"].items()],
+                    "declared": signature in declared,
+                    "missing": False,
+                    "ops": accesses["ops"] if accesses else None,
+                    "since": accesses["since"] if accesses else None,
+                    "unused": accesses["ops"] == 0 if accesses else None,
+                    "redundant_with": redundant_with
+                })
+
+            for model in repo.INDEXES:
+                if _key_signature(model.document) not in live_signatures:
+                    report.append({
+                        "collection": repo.collection.name,
+                        "name": model.document["name"],
+                        "key": [[field, direction] for field, direction in model.document["key"].items()],
+                        "declared": True,
+                        "missing": True
+                    })
+
+        return report
@@ -1,6 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.repositories.project_repository import ProjectRepository
 from app.schemas.project import ProjectCreate, ProjectUpdate
+from app.services.report_cache import report_cache
 from typing import List, Optional
 
 
@@ -20,7 +21,9 @@ class ProjectService:
         project_dict = project_data.model_dump()
         project_dict["created_by"] = user_id
         
-        return await self.project_repo.create(project_dict)
+        project = await self.project_repo.create(project_dict)
+        report_cache.invalidate()
+        return project
     
     async def get_all_projects(self) -> List[dict]:
         """Get all projects"""
@@ -36,8 +39,14 @@ class ProjectService:
         if not update_dict:
             return False
         
-        return await self.project_repo.update(project_id, update_dict)
+        updated = await self.project_repo.update(project_id, update_dict)
+        if updated:
+            report_cache.invalidate()
+        return updated
     
     async def delete_project(self, project_id: str) -> bool:
         """Delete a project"""
-        return await self.project_repo.delete(project_id)
+        deleted = await self.project_repo.delete(project_id)
+        if deleted:
+            report_cache.invalidate()
+        return deleted
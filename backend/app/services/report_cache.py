@@ -0,0 +1,62 @@
+import asyncio
+from app.config import settings
+from app.utils.cache import TTLCache
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class ReportCache:
+    """In-process cache of report results with write-driven invalidation
+
+    Results are kept for a TTL and tagged with the generation they were
+    computed in; task, project and user writes bump the generation, which
+    makes every earlier result stale at once. Concurrent requests for the
+    same report in the same generation share one computation (single-flight).
+    """
+
+    def __init__(
+        self,
+        maxsize: int = settings.REPORT_CACHE_SIZE,
+        ttl: float = settings.REPORT_CACHE_TTL_SECONDS
+    ):
+        self.generation = 0
+        self._results = TTLCache(maxsize, ttl)
+        self._inflight: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+
+    def invalidate(self):
+        """Mark every cached result as stale (called after data writes)"""
+        self.generation += 1
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached result for a key, computing it at most once per generation"""
+        generation = self.generation
+        cached = self._results.get(key)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+
+        flight_key = (generation, key)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            task = asyncio.create_task(compute())
+            self._inflight[flight_key] = task
+
+            def finish(done: asyncio.Task):
+                self._inflight.pop(flight_key, None)
+                # Results that raced with a write are returned but not kept
+                if not done.cancelled() and done.exception() is None and self.generation == generation:
+                    self._results.set(key, (generation, done.result()))
+
+            task.add_done_callback(finish)
+
+        # A waiter giving up must not cancel the computation shared with the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters plus the current generation and in-flight computations"""
+        return {
+            **self._results.stats(),
+            "generation": self.generation,
+            "inflight": len(self._inflight)
+        }
+
+
+report_cache = ReportCache()
@@ -0,0 +1,316 @@
+import asyncio
+import gzip
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel, ValidationError
+from app.config import settings
+from app.repositories.report_job_repository import ReportJobRepository
+from app.schemas.report import (
+    ReportJobType, ReportJobStatus, ActivityJobParams, AnalyticsJobParams, ExportJobParams
+)
+from app.services.stats_service import StatsService
+from app.services.activity_service import ActivityService
+from app.services.task_service import TaskService
+from app.utils.dates import to_naive_utc
+from app.utils.validation import validation_message
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Type
+
+# Parameters accepted by each job type (types without an entry take none)
+_JOB_PARAMS: Dict[ReportJobType, Type[BaseModel]] = {
+    ReportJobType.ACTIVITY: ActivityJobParams,
+    ReportJobType.ANALYTICS: AnalyticsJobParams,
+    ReportJobType.EXPORT: ExportJobParams
+}
+
+# Jobs may cover far longer ranges than synchronous activity reports
+_JOB_MAX_BUCKETS = 5000
+
+# Exports are compressed in blocks of this size, each block on the process pool
+_EXPORT_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Seconds between heartbeats on the unfinished jobs of a process (and sweeps)
+_HEARTBEAT_SECONDS = 30
+
+# Unfinished jobs without a heartbeat for this long belong to a dead process
+_STALE_AFTER = timedelta(seconds=3 * _HEARTBEAT_SECONDS)
+
+
+class ReportQueueFull(Exception):
+    """Raised when no more report jobs can be queued"""
+
+
+class ReportJobQueue:
+    """Background execution of long-running reports
+    
+    Jobs are stored in report_jobs (expiring after REPORT_JOB_TTL_HOURS) and
+    queued in memory for a fixed number of asyncio workers; the queue is
+    bounded and submit() refuses jobs when it is full. CPU-heavy steps
+    (compressing exports) run on a process pool so they neither block the
+    event loop nor hold the GIL. Export files go to GridFS. Jobs still
+    queued or running when the process stops are marked failed; if it dies
+    instead, its jobs stop receiving heartbeats and another process (or
+    this one after a restart) fails them once they go stale.
+    """
+    
+    def __init__(
+        self,
+        workers: int = settings.REPORT_JOB_WORKERS,
+        max_size: int = settings.REPORT_JOB_MAX_QUEUE,
+        processes: int = settings.REPORT_JOB_PROCESSES,
+        ttl: timedelta = timedelta(hours=settings.REPORT_JOB_TTL_HOURS)
+    ):
+        self.workers = workers
+        self.max_size = max_size
+        self.processes = processes
+        self.ttl = ttl
+        # Identifies the jobs queued in this process
+        self.worker_id = uuid.uuid4().hex
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._maintenance: Optional[asyncio.Task] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+    
+    @property
+    def running(self) -> bool:
+        """Whether jobs are being accepted"""
+        return any(not worker.done() for worker in self._workers)
+    
+    @property
+    def pending(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize() if self._queue else 0
+    
+    def start(self, db: AsyncIOMotorDatabase):
+        """Start the worker tasks"""
+        if self.running:
+            return
+        self._db = db
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+        self._maintenance = asyncio.create_task(self._maintain())
+    
+    async def stop(self):
+        """Stop the workers, failing the jobs they leave unfinished"""
+        if not self._workers:
+            return
+        for worker in self._workers:
+            worker.cancel()
+        if self._maintenance:
+            self._maintenance.cancel()
+        await asyncio.gather(*self._workers, self._maintenance, return_exceptions=True)
+        self._workers = []
+        self._maintenance = None
+        
+        try:
+            await ReportJobRepository(self._db).fail_unfinished(self.worker_id, "Interrupted by a server shutdown")
+        except Exception as e:
+            print(f"Failed to mark interrupted report jobs: {e}")
+        
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+    
+    def validate_params(self, job_type: ReportJobType, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Check a job's parameters, raising ValueError with the reason if invalid"""
+        model = _JOB_PARAMS.get(job_type)
+        if model is None:
+            if params:
+                raise ValueError(f"The {job_type.value} report takes no parameters")
+            return {}
+        
+        try:
+            validated = model.model_validate(params)
+        except ValidationError as e:
+            raise ValueError(validation_message(e))
+        if job_type == ReportJobType.ACTIVITY and validated.scope != "global" and not validated.id:
+            raise ValueError(f"An id is required for the {validated.scope} scope")
+        return validated.model_dump(mode="json", exclude_none=True)
+    
+    async def submit(self, job_type: ReportJobType, params: Dict[str, Any], user_id: str) -> dict:
+        """Store and queue a job, raising ReportQueueFull when it can't be queued"""
+        params = self.validate_params(job_type, params)
+        if not self.running or self._queue.full():
+            raise ReportQueueFull("Too many report jobs in progress, try again later")
+        
+        now = datetime.utcnow()
+        job = await ReportJobRepository(self._db).create({
+            "type": job_type.value,
+            "params": params,
+            "user_id": user_id,
+            "status": ReportJobStatus.QUEUED.value,
+            "worker_id": self.worker_id,
+            "heartbeat_at": now,
+            "expires_at": now + self.ttl
+        })
+        
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # Another request took the last slot while the job was being stored
+            await ReportJobRepository(self._db).update(job["_id"], {
+                "status": ReportJobStatus.FAILED.value,
+                "error": "Queue full",
+                "finished_at": datetime.utcnow()
+            })
+            raise ReportQueueFull("Too many report jobs in progress, try again later")
+        return job
+    
+    async def _run(self):
+        """Worker loop: run queued jobs one at a time"""
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._execute(job)
+            except Exception as e:
+                print(f"Report job {job['_id']} could not be recorded: {e}")
+            finally:
+                self._queue.task_done()
+    
+    async def _maintain(self):
+        """Heartbeat loop: keep this process's jobs alive, fail stale ones and drop expired files"""
+        while True:
+            try:
+                job_repo = ReportJobRepository(self._db)
+                await job_repo.heartbeat(self.worker_id)
+                stale = await job_repo.fail_stale(
+                    datetime.utcnow() - _STALE_AFTER, "Interrupted: the server process stopped"
+                )
+                if stale:
+                    print(f"Failed {stale} report jobs left unfinished by a stopped server process")
+                await job_repo.delete_expired_files(datetime.utcnow())
+            except Exception as e:
+                print(f"Report job maintenance failed: {e}")
+            await asyncio.sleep(_HEARTBEAT_SECONDS)
+    
+    async def _execute(self, job: dict):
+        """Run one job and store its outcome"""
+        job_repo = ReportJobRepository(self._db)
+        await job_repo.update(job["_id"], {
+            "status": ReportJobStatus.RUNNING.value,
+            "started_at": datetime.utcnow()
+        })
+        
+        try:
+            outcome = await self._compute(ReportJobType(job["type"]), job["params"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            finished = datetime.utcnow()
+            await job_repo.update(job["_id"], {
+                "status": ReportJobStatus.FAILED.value,
+                "error": str(e) or e.__class__.__name__,
+                "finished_at": finished,
+                "expires_at": finished + self.ttl
+            })
+            return
+        
+        # Results are kept for the full TTL once they are ready
+        finished = datetime.utcnow()
+        await job_repo.update(job["_id"], {
+            **outcome,
+            "status": ReportJobStatus.COMPLETED.value,
+            "finished_at": finished,
+            "expires_at": finished + self.ttl
+        })
+    
+    async def _compute(self, job_type: ReportJobType, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Produce a job's result fields"""
+        db = self._db
+        
+        if job_type == ReportJobType.STATS:
+            return {"result": await StatsService(db).get_task_statistics()}
+        if job_type == ReportJobType.TASKS:
+            return {"result": await StatsService(db).get_tasks_by_status()}
+        if job_type == ReportJobType.PROJECTS:
+            return {"result": await StatsService(db).get_tasks_by_project()}
+        if job_type == ReportJobType.USERS:
+            return {"result": await StatsService(db).get_tasks_by_user()}
+        
+        if job_type == ReportJobType.ACTIVITY:
+            p = ActivityJobParams.model_validate(params)
+            end = to_naive_utc(p.end) or datetime.utcnow()
+            start = to_naive_utc(p.start) or end - timedelta(days=30)
+            if start >= end:
+                raise ValueError("start must be before end")
+            return {"result": await ActivityService(db).get_activity(
+                p.scope, p.id, p.unit, start, end, max_buckets=_JOB_MAX_BUCKETS
+            )}
+        
+        if job_type == ReportJobType.ANALYTICS:
+            p = AnalyticsJobParams.model_validate(params)
+            filters = p.model_dump()
+            filters["due_from"] = to_naive_utc(p.due_from)
+            filters["due_to"] = to_naive_utc(p.due_to)
+            return {"result": await StatsService(db).get_analytics(filters)}
+        
+        p = ExportJobParams.model_validate(params)
+        filters = p.model_dump(exclude={"format", "search_mode"}, exclude_none=True)
+        if p.text:
+            filters["search_mode"] = p.search_mode
+        return await self._export(TaskService(db), filters, p.format)
+    
+    async def _export(self, task_service: TaskService, filters: Dict[str, Any], export_format: str) -> Dict[str, Any]:
+        """Export tasks into a gzip file in GridFS, compressing block by block on the process pool"""
+        filename = f"tasks.{export_format}"
+        upload = ReportJobRepository(self._db).open_file_upload(filename, {
+            # Slack so the file outlives its job, which expires a TTL after finishing
+            "expires_at": datetime.utcnow() + self.ttl + timedelta(hours=1)
+        })
+        block: List[bytes] = []
+        block_size = 0
+        
+        # Concatenated gzip members form a valid gzip file
+        async def flush():
+            nonlocal block, block_size
+            await upload.write(await self._run_cpu(gzip.compress, b"".join(block)))
+            block = []
+            block_size = 0
+        
+        try:
+            wrote = False
+            async for line in task_service.export_tasks(filters, export_format):
+                data = line.encode("utf-8")
+                block.append(data)
+                block_size += len(data)
+                if block_size >= _EXPORT_BLOCK_SIZE:
+                    await flush()
+                    wrote = True
+            if block or not wrote:
+                await flush()
+            await upload.close()
+        except BaseException:
+            await upload.abort()
+            raise
+        
+        return {
+            "result_file_id": upload._id,
+            "media_type": "text/csv" if export_format == "csv" else "application/x-ndjson",
+            "filename": filename
+        }
+    
+    async def _run_cpu(self, func: Callable, *args: Any) -> Any:
+        """Run a CPU-bound, picklable function on the process pool"""
+        if self._pool is None:
+            # Spawned (not forked) workers don't inherit the event loop or driver threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, func, *args)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and pool sizes"""
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_queue": self.max_size,
+            "processes": self.processes
+        }
+
+
+report_jobs = ReportJobQueue()
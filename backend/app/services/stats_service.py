@@ -2,92 +2,138 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.repositories.task_repository import TaskRepository
 from app.repositories.project_repository import ProjectRepository
 from app.repositories.user_repository import UserRepository
+from app.services.counter_service import CounterService
+from app.services.task_snapshot import task_snapshot
 from datetime import datetime
+import asyncio
 from typing import Dict, Any, List
-from collections import defaultdict
+
+
+def _label_counts(totals: Dict[str, int], names: Dict[str, str], label: str) -> List[Dict[str, Any]]:
+    """Group per-ID totals by referenced name, unresolved IDs counted as Unknown"""
+    counts: Dict[str, int] = {}
+    for ref_id, total in totals.items():
+        name = names.get(ref_id, "Unknown")
+        counts[name] = counts.get(name, 0) + total
+    return [{label: name, "count": count} for name, count in counts.items()]
+
+
+def _counter_statistics(counters: Dict[str, Any], overdue: int) -> Dict[str, int]:
+    """Task statistics from the global counters"""
+    status = counters.get("status", {})
+    priority = counters.get("priority", {})
+    return {
+        "total": counters.get("total", 0),
+        "completed": status.get("Completada", 0),
+        "pending": status.get("Pendiente", 0),
+        "in_progress": status.get("En Progreso", 0),
+        "high_priority": priority.get("Alta", 0) + priority.get("Crítica", 0),
+        "overdue": overdue
+    }
 
 
 class StatsService:
-    """Service for statistics and metrics"""
-    
+    """Service for statistics and metrics
+
+    Counts are read from the materialized task counters; until they have been
+    built once (see CounterService.rebuild) the tasks are aggregated instead.
+    """
+
     def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
         self.task_repo = TaskRepository(db)
         self.project_repo = ProjectRepository(db)
         self.user_repo = UserRepository(db)
-    
+        self.counter_service = CounterService(db)
+
     async def get_task_statistics(self) -> Dict[str, Any]:
         """Get comprehensive task statistics"""
-        tasks = await self.task_repo.get_all()
-        
-        total_tasks = len(tasks)
-        completed_tasks = sum(1 for t in tasks if t.get("status") == "Completada")
-        pending_tasks = sum(1 for t in tasks if t.get("status") == "Pendiente")
-        in_progress_tasks = sum(1 for t in tasks if t.get("status") == "En Progreso")
-        
-        # High priority and critical tasks
-        high_priority = sum(1 for t in tasks if t.get("priority") in ["Alta", "Crítica"])
-        
-        # Overdue tasks
         now = datetime.utcnow()
-        overdue_tasks = sum(
-            1 for t in tasks 
-            if t.get("due_date") and t["due_date"] < now and t.get("status") != "Completada"
-        )
-        
-        return {
-            "total": total_tasks,
-            "completed": completed_tasks,
-            "pending": pending_tasks,
-            "in_progress": in_progress_tasks,
-            "high_priority": high_priority,
-            "overdue": overdue_tasks
-        }
-    
+        if not await self.counter_service.is_initialized():
+            return await self.task_repo.get_statistics(now)
+
+        counters = await self.counter_service.get("global")
+        # Overdue depends on the clock, so it stays a live (indexed) count
+        return _counter_statistics(counters, await self.task_repo.count_overdue(now))
+
     async def get_tasks_by_status(self) -> Dict[str, int]:
         """Get task count grouped by status"""
-        tasks = await self.task_repo.get_all()
-        status_count = defaultdict(int)
-        
-        for task in tasks:
-            status = task.get("status", "Unknown")
-            status_count[status] += 1
-        
-        return dict(status_count)
-    
+        if not await self.counter_service.is_initialized():
+            return await self.task_repo.count_by_status()
+
+        counters = await self.counter_service.get("global")
+        return {status: count for status, count in counters["status"].items() if count > 0}
+
     async def get_tasks_by_project(self) -> List[Dict[str, Any]]:
         """Get task count grouped by project"""
-        tasks = await self.task_repo.get_all()
-        projects = await self.project_repo.get_all()
-        
-        project_map = {p["_id"]: p["name"] for p in projects}
-        project_count = defaultdict(int)
-        
-        for task in tasks:
-            project_id = task.get("project_id")
-            if project_id:
-                project_name = project_map.get(project_id, "Unknown")
-                project_count[project_name] += 1
-        
-        return [
-            {"project": name, "count": count}
-            for name, count in project_count.items()
-        ]
-    
+        if not await self.counter_service.is_initialized():
+            return await self.task_repo.count_by_project()
+
+        totals = await self.counter_service.get_dimension("project")
+        names = await self.project_repo.find_names_by_ids(list(totals))
+        return _label_counts(totals, names, "project")
+
     async def get_tasks_by_user(self) -> List[Dict[str, Any]]:
         """Get task count grouped by assigned user"""
-        tasks = await self.task_repo.get_all()
+        if not await self.counter_service.is_initialized():
+            return await self.task_repo.count_by_assignee()
+
+        totals = await self.counter_service.get_dimension("assignee")
+        names = await self.user_repo.find_names_by_ids(list(totals))
+        return _label_counts(totals, names, "user")
+
+    async def get_user_list(self) -> List[Dict[str, str]]:
+        """Get the ID and username of every user, for dropdowns"""
         users = await self.user_repo.get_all()
-        
-        user_map = {u["_id"]: u["username"] for u in users}
-        user_count = defaultdict(int)
-        
-        for task in tasks:
-            user_id = task.get("assigned_to")
-            if user_id:
-                username = user_map.get(user_id, "Unknown")
-                user_count[username] += 1
-        
         return [
-            {"user": name, "count": count}
-            for name, count in user_count.items()
+            {"id": user["_id"], "username": user["username"]}
+            for user in users
         ]
+
+    async def get_overview(self) -> Dict[str, Any]:
+        """Statistics plus task counts by status, project and user, in as few queries as possible"""
+        now = datetime.utcnow()
+        overview = await self.counter_service.get_overview()
+
+        if overview:
+            # Overdue depends on the time, so it is the one count not kept in the counters
+            overdue = await self.task_repo.count_overdue(now)
+            global_counters = overview["global"]
+            stats = _counter_statistics(global_counters, overdue)
+            by_status = {
+                status: count for status, count in global_counters.get("status", {}).items() if count > 0
+            }
+            by_project, by_assignee = overview["project"], overview["assignee"]
+        else:
+            # Counters not built yet: one $facet pass over the tasks
+            facets = await self.task_repo.get_overview(now)
+            stats, by_status = facets["stats"], facets["by_status"]
+            by_project, by_assignee = facets["by_project"], facets["by_assignee"]
+
+        projects, users = await asyncio.gather(
+            self.project_repo.find_names_by_ids(list(by_project)),
+            self.user_repo.find_names_by_ids(list(by_assignee))
+        )
+        return {
+            "stats": stats,
+            "by_status": by_status,
+            "by_project": _label_counts(by_project, projects, "project"),
+            "by_user": _label_counts(by_assignee, users, "user")
+        }
+
+    async def get_analytics(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Filter and group every task field from the in-memory columnar snapshot"""
+        await task_snapshot.refresh(self.db)
+        summary = task_snapshot.summarize(filters, datetime.utcnow())
+
+        projects = await self.project_repo.find_names_by_ids(
+            [group["key"] for group in summary["by_project"] if group["key"]]
+        )
+        users = await self.user_repo.find_names_by_ids(
+            [group["key"] for group in summary["by_assignee"] if group["key"]]
+        )
+        for groups, names in ((summary["by_project"], projects), (summary["by_assignee"], users)):
+            for group in groups:
+                group["name"] = names.get(group["key"], "Unknown") if group["key"] else None
+
+        return summary
@@ -2,12 +2,58 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.repositories.task_repository import TaskRepository
 from app.repositories.project_repository import ProjectRepository
 from app.repositories.user_repository import UserRepository
-from app.repositories.history_repository import HistoryRepository
 from app.repositories.notification_repository import NotificationRepository
 from app.schemas.task import TaskCreate, TaskUpdate, TaskWithDetails
 from app.schemas.history import HistoryAction
+from app.utils.dates import to_naive_utc
+from app.utils.validation import validation_message
 from app.schemas.notification import NotificationType
-from typing import List, Optional, Dict, Any
+from app.services.write_behind import write_behind
+from app.services.counter_service import CounterService, counter_fence
+from app.services.activity_service import ActivityService
+from app.services.report_cache import report_cache
+from app.utils.formats import (
+    TASK_EXPORT_FIELDS, to_ndjson_line, csv_line, to_csv_line, iter_csv_rows, iter_ndjson_rows
+)
+from app.config import settings
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from itertools import islice
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator, BinaryIO
+from datetime import datetime
+import csv
+import io
+
+# Name-to-ID caches of an import are reset beyond this size to keep memory bounded
+_IMPORT_CACHE_LIMIT = 10000
+
+# Import columns referencing a project or assignee by name
+_IMPORT_NAME_FIELDS = ("project_name", "assigned_to_name")
+
+
+def _task_snapshot(task: dict) -> dict:
+    """Project, assignee and status of a task, recorded on its history entries"""
+    return {
+        "project_id": task.get("project_id"),
+        "assigned_to": task.get("assigned_to"),
+        "status": task.get("status")
+    }
+
+
+def _import_name_error(row: dict) -> Optional[str]:
+    """Why a row's name references can't be looked up (NDJSON values may be of any type)"""
+    for field in _IMPORT_NAME_FIELDS:
+        value = row.get(field)
+        if value is not None and not isinstance(value, str):
+            return f"{field}: must be a string"
+    return None
+
+
+def _change_value(value: Any) -> Any:
+    """Normalize a field value for diffing and storing in a change-set"""
+    if isinstance(value, datetime):
+        return to_naive_utc(value)
+    return getattr(value, "value", value)
 
 
 class TaskService:
@@ -17,34 +63,100 @@ class TaskService:
         self.task_repo = TaskRepository(db)
         self.project_repo = ProjectRepository(db)
         self.user_repo = UserRepository(db)
-        self.history_repo = HistoryRepository(db)
         self.notification_repo = NotificationRepository(db)
+        self.counter_service = CounterService(db)
+        self.activity_service = ActivityService(db)
+        self.history_writer = self.activity_service.history_writer()
     
-    async def create_task(self, task_data: TaskCreate, user_id: str) -> dict:
-        """Create a new task with automatic history logging and notifications"""
-        task_dict = task_data.model_dump()
-        
-        # Create the task
-        task = await self.task_repo.create(task_dict)
-        
-        # Log creation in history
-        history_entry = {
+    def _creation_side_effects(self, task: dict, user_id: str) -> Tuple[List[dict], List[dict]]:
+        """History entries and notifications produced by creating a task"""
+        history_entries = [{
             "task_id": task["_id"],
             "user_id": user_id,
             "action": HistoryAction.CREATED,
             "old_value": None,
-            "new_value": task["title"]
-        }
-        await self.history_repo.create(history_entry)
+            "new_value": task["title"],
+            **_task_snapshot(task)
+        }]
         
-        # Create notification if task is assigned
+        # Notify the assignee, if any
+        notifications = []
         if task.get("assigned_to"):
-            notification = {
+            notifications.append({
                 "user_id": task["assigned_to"],
                 "message": f"Nueva tarea asignada: {task['title']}",
                 "type": NotificationType.TASK_ASSIGNED
-            }
-            await self.notification_repo.create(notification)
+            })
+        
+        return history_entries, notifications
+    
+    def _update_side_effects(
+        self,
+        task_id: str,
+        current_task: dict,
+        update_dict: dict,
+        user_id: str
+    ) -> Tuple[List[dict], List[dict]]:
+        """History entry and notifications produced by applying an update to a task
+        
+        The update is logged as one change-set entry with a {field, old, new}
+        diff per changed TaskUpdate field (see expand_entry for the per-action
+        shape the API returns).
+        """
+        # Diff every updatable field that was provided
+        changes = []
+        for field in TaskUpdate.model_fields:
+            if field not in update_dict:
+                continue
+            old_value = _change_value(current_task.get(field))
+            new_value = _change_value(update_dict[field])
+            if old_value != new_value:
+                changes.append({"field": field, "old": old_value, "new": new_value})
+        
+        # Notify the new assignee
+        notifications = []
+        if any(change["field"] == "assigned_to" for change in changes) and update_dict["assigned_to"]:
+            notifications.append({
+                "user_id": update_dict["assigned_to"],
+                "message": f"Tarea actualizada y asignada a ti: {current_task['title']}",
+                "type": NotificationType.TASK_UPDATED
+            })
+        
+        history_entries = [{
+            "task_id": task_id,
+            "user_id": user_id,
+            "action": HistoryAction.UPDATED,
+            "changes": changes,
+            **_task_snapshot({**current_task, **update_dict})
+        }]
+        
+        return history_entries, notifications
+    
+    def _deletion_side_effects(self, task: dict, user_id: str) -> List[dict]:
+        """History entries produced by deleting a task"""
+        return [{
+            "task_id": task["_id"],
+            "user_id": user_id,
+            "action": HistoryAction.DELETED,
+            "old_value": task["title"],
+            "new_value": None,
+            **_task_snapshot(task)
+        }]
+    
+    async def create_task(self, task_data: TaskCreate, user_id: str) -> dict:
+        """Create a new task with automatic history logging and notifications"""
+        task_dict = task_data.model_dump()
+        
+        # Create the task
+        async with counter_fence.write():
+            task = await self.task_repo.create(task_dict)
+            await self.counter_service.record(added=[task])
+        report_cache.invalidate()
+        
+        # Log creation in history and notify the assignee
+        history_entries, notifications = self._creation_side_effects(task, user_id)
+        await write_behind.submit(self.history_writer, history_entries)
+        await write_behind.submit(self.notification_repo, notifications)
         
         return task
     
@@ -56,101 +168,39 @@ class TaskService:
         """Get a task by ID"""
         return await self.task_repo.find_by_id(task_id)
     
-    async def get_tasks_with_details(self) -> List[TaskWithDetails]:
-        """Get all tasks with project and user details"""
-        tasks = await self.task_repo.get_all()
-        projects = await self.project_repo.get_all()
-        users = await self.user_repo.get_all()
-        
-        # Create lookup dictionaries
-        project_map = {p["_id"]: p["name"] for p in projects}
-        user_map = {u["_id"]: u["username"] for u in users}
-        
-        # Enrich tasks with details
-        enriched_tasks = []
-        for task in tasks:
-            task["project_name"] = project_map.get(task.get("project_id"))
-            task["assigned_to_name"] = user_map.get(task.get("assigned_to"))
-            enriched_tasks.append(task)
-        
-        return enriched_tasks
-    
-    async def update_task(self, task_id: str, task_data: TaskUpdate, user_id: str) -> bool:
-        """Update a task with automatic history logging and notifications"""
-        # Get current task
-        current_task = await self.task_repo.find_by_id(task_id)
-        if not current_task:
-            return False
-        
+    async def get_tasks_with_details(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[TaskWithDetails], Optional[str]]:
+        """Get a page of tasks with project and user details"""
+        return await self.task_repo.search_with_details({}, limit, cursor)
+    
+    async def update_task(self, task_id: str, task_data: TaskUpdate, user_id: str) -> Optional[dict]:
+        """Update a task with automatic history logging and notifications, returning the updated task"""
         update_dict = task_data.model_dump(exclude_unset=True)
         if not update_dict:
-            return False
+            return None
         
-        # Track changes for history
-        changes = []
+        # Update the task in one round trip, getting back its previous state
+        async with counter_fence.write():
+            previous_task = await self.task_repo.update_returning_previous(task_id, update_dict)
+            if previous_task:
+                updated_task = {**previous_task, **update_dict}
+                await self.counter_service.record(removed=[previous_task], added=[updated_task])
+        if not previous_task:
+            return None
+        report_cache.invalidate()
         
-        # Check for status change
-        if "status" in update_dict and update_dict["status"] != current_task.get("status"):
-            changes.append({
-                "action": HistoryAction.STATUS_CHANGED,
-                "old_value": current_task.get("status"),
-                "new_value": update_dict["status"]
-            })
-        
-        # Check for title change
-        if "title" in update_dict and update_dict["title"] != current_task.get("title"):
-            changes.append({
-                "action": HistoryAction.TITLE_CHANGED,
-                "old_value": current_task.get("title"),
-                "new_value": update_dict["title"]
-            })
+        # Diff against the pre-image, so concurrent edits each log their own old values
+        history_entries, notifications = self._update_side_effects(
+            task_id, previous_task, update_dict, user_id
+        )
+        await write_behind.submit(self.notification_repo, notifications)
+        await write_behind.submit(self.history_writer, history_entries)
         
-        # Check for priority change
-        if "priority" in update_dict and update_dict["priority"] != current_task.get("priority"):
-            changes.append({
-                "action": HistoryAction.PRIORITY_CHANGED,
-                "old_value": current_task.get("priority"),
-                "new_value": update_dict["priority"]
-            })
-        
-        # Check for assignment change
-        if "assigned_to" in update_dict and update_dict["assigned_to"] != current_task.get("assigned_to"):
-            changes.append({
-                "action": HistoryAction.ASSIGNED,
-                "old_value": current_task.get("assigned_to"),
-                "new_value": update_dict["assigned_to"]
-            })
-            
-            # Create notification for new assignee
-            if update_dict["assigned_to"]:
-                notification = {
-                    "user_id": update_dict["assigned_to"],
-                    "message": f"Tarea actualizada y asignada a ti: {current_task['title']}",
-                    "type": NotificationType.TASK_UPDATED
-                }
-                await self.notification_repo.create(notification)
-        
-        # If no specific changes, log as general update
-        if not changes:
-            changes.append({
-                "action": HistoryAction.UPDATED,
-                "old_value": None,
-                "new_value": None
-            })
-        
-        # Log all changes in history
-        for change in changes:
-            history_entry = {
-                "task_id": task_id,
-                "user_id": user_id,
-                "action": change["action"],
-                "old_value": change.get("old_value"),
-                "new_value": change.get("new_value")
-            }
-            await self.history_repo.create(history_entry)
-        
-        # Update the task
-        return await self.task_repo.update(task_id, update_dict)
+        # Only $set was applied, so the new state is the pre-image plus the changes
+        return updated_task
     
     async def delete_task(self, task_id: str, user_id: str) -> bool:
         """Delete a task with history logging"""
@@ -159,24 +209,296 @@ class TaskService:
         if not task:
             return False
         
-        # Log deletion
-        history_entry = {
-            "task_id": task_id,
-            "user_id": user_id,
-            "action": HistoryAction.DELETED,
-            "old_value": task["title"],
-            "new_value": None
-        }
-        await self.history_repo.create(history_entry)
-        
-        # Delete the task
-        result = await self.task_repo.delete(task_id)
+        # Delete the task, then log the deletion (written behind, so it lands shortly after)
+        async with counter_fence.write():
+            result = await self.task_repo.delete(task_id)
+            if result:
+                await self.counter_service.record(removed=[task])
+        if result:
+            report_cache.invalidate()
+            history_entries = self._deletion_side_effects(task, user_id)
+            await write_behind.submit(self.history_writer, history_entries)
         
         # Optionally delete task history after some time
         # For now we keep it for audit purposes
         
         return result
     
-    async def search_tasks(self, filters: Dict[str, Any]) -> List[dict]:
-        """Search tasks with filters"""
-        return await self.task_repo.search(filters)
+    async def bulk_create_tasks(self, items: List[Dict[str, Any]], user_id: str) -> List[dict]:
+        """Create many tasks with batched history and notifications, one result per item"""
+        results = [None] * len(items)
+        valid_positions = []
+        tasks = []
+        
+        for index, item in enumerate(items):
+            try:
+                tasks.append(TaskCreate.model_validate(item).model_dump())
+                valid_positions.append(index)
+            except ValidationError as e:
+                results[index] = {"index": index, "success": False, "error": validation_message(e)}
+        
+        if tasks:
+            async with counter_fence.write():
+                errors = await self.task_repo.create_many(tasks)
+                await self.counter_service.record(
+                    added=[task for position, task in enumerate(tasks) if position not in errors]
+                )
+            
+            created = []
+            history_entries = []
+            notifications = []
+            for position, (index, task) in enumerate(zip(valid_positions, tasks)):
+                if position in errors:
+                    results[index] = {"index": index, "success": False, "error": errors[position]}
+                    continue
+                
+                results[index] = {"index": index, "id": task["_id"], "success": True}
+                created.append(task)
+                task_history, task_notifications = self._creation_side_effects(task, user_id)
+                history_entries.extend(task_history)
+                notifications.extend(task_notifications)
+            
+            report_cache.invalidate()
+            await write_behind.submit(self.history_writer, history_entries)
+            await write_behind.submit(self.notification_repo, notifications)
+        
+        return results
+    
+    async def bulk_update_tasks(self, items: List[Dict[str, Any]], user_id: str) -> List[dict]:
+        """Update many tasks with batched history, one result per item
+        
+        Every update returns its own pre-image, as in update_task, so
+        counters and history old values hold under concurrent edits, and a
+        task deleted meanwhile is reported as not found.
+        """
+        results = [None] * len(items)
+        
+        updates = []
+        update_positions = []
+        for index, item in enumerate(items):
+            task_id = item["id"]
+            try:
+                update_dict = TaskUpdate.model_validate(item["changes"]).model_dump(exclude_unset=True)
+            except ValidationError as e:
+                results[index] = {"index": index, "id": task_id, "success": False, "error": validation_message(e)}
+                continue
+            
+            if not update_dict:
+                results[index] = {"index": index, "id": task_id, "success": False, "error": "No changes provided"}
+            else:
+                updates.append((task_id, update_dict))
+                update_positions.append(index)
+        
+        if updates:
+            async with counter_fence.write():
+                previous_tasks = await self.task_repo.update_many_returning_previous(updates)
+                
+                previous = []
+                updated = []
+                history_entries = []
+                notifications = []
+                for index, (task_id, update_dict), previous_task in zip(update_positions, updates, previous_tasks):
+                    if not previous_task:
+                        results[index] = {"index": index, "id": task_id, "success": False, "error": "Task not found"}
+                        continue
+                    
+                    results[index] = {"index": index, "id": task_id, "success": True}
+                    previous.append(previous_task)
+                    updated.append({**previous_task, **update_dict})
+                    task_history, task_notifications = self._update_side_effects(
+                        task_id, previous_task, update_dict, user_id
+                    )
+                    history_entries.extend(task_history)
+                    notifications.extend(task_notifications)
+                
+                await self.counter_service.record(removed=previous, added=updated)
+            
+            report_cache.invalidate()
+            await write_behind.submit(self.history_writer, history_entries)
+            await write_behind.submit(self.notification_repo, notifications)
+        
+        return results
+    
+    async def bulk_delete_tasks(self, task_ids: List[str], user_id: str) -> List[dict]:
+        """Delete many tasks with batched history, one result per item
+        
+        Counters and history only cover the tasks this request actually
+        deleted, so a concurrent delete of the same task is counted once.
+        """
+        async with counter_fence.write():
+            deleted = await self.task_repo.delete_many_returning(task_ids)
+            await self.counter_service.record(removed=list(deleted.values()))
+        
+        results = []
+        for index, task_id in enumerate(task_ids):
+            if task_id in deleted:
+                results.append({"index": index, "id": task_id, "success": True})
+            else:
+                results.append({"index": index, "id": task_id, "success": False, "error": "Task not found"})
+        
+        removed = list(deleted.values())
+        if removed:
+            report_cache.invalidate()
+            
+            # Log the deletions (written behind, so they land after the deletes)
+            history_entries = []
+            for task in removed:
+                history_entries.extend(self._deletion_side_effects(task, user_id))
+            await write_behind.submit(self.history_writer, history_entries)
+        
+        return results
+    
+    async def search_tasks(
+        self,
+        filters: Dict[str, Any],
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Search tasks with filters, one page at a time, with project and user details"""
+        return await self.task_repo.search_with_details(filters, limit, cursor)
+    
+    async def export_tasks(self, filters: Dict[str, Any], export_format: str = "ndjson") -> AsyncIterator[str]:
+        """Stream matching tasks with details as NDJSON or CSV lines"""
+        if export_format == "csv":
+            yield csv_line(TASK_EXPORT_FIELDS)
+        
+        async for task in self.task_repo.stream_with_details(filters):
+            if export_format == "csv":
+                yield to_csv_line(task, TASK_EXPORT_FIELDS)
+            else:
+                yield to_ndjson_line(task)
+    
+    async def _resolve_import_names(
+        self,
+        rows: List[Tuple[int, Optional[dict], Optional[str]]],
+        project_ids: Dict[str, str],
+        user_ids: Dict[str, str]
+    ):
+        """Resolve the project names and usernames of a batch with one query each"""
+        if len(project_ids) > _IMPORT_CACHE_LIMIT:
+            project_ids.clear()
+        if len(user_ids) > _IMPORT_CACHE_LIMIT:
+            user_ids.clear()
+        
+        project_names = {
+            row["project_name"] for _, row, _ in rows
+            if row and row.get("project_name") and not row.get("project_id")
+        } - project_ids.keys()
+        usernames = {
+            row["assigned_to_name"] for _, row, _ in rows
+            if row and row.get("assigned_to_name") and not row.get("assigned_to")
+        } - user_ids.keys()
+        
+        if project_names:
+            project_ids.update(await self.project_repo.find_ids_by_names(list(project_names)))
+        if usernames:
+            user_ids.update(await self.user_repo.find_ids_by_usernames(list(usernames)))
+    
+    def _import_row(
+        self,
+        row: dict,
+        project_ids: Dict[str, str],
+        user_ids: Dict[str, str]
+    ) -> Tuple[Optional[dict], Optional[str]]:
+        """Turn an imported row into a task document, or explain why it is rejected"""
+        data = {key: value for key, value in row.items() if value is not None}
+        
+        # Rows may reference projects and assignees by name, as exports do
+        project_name = data.pop("project_name", None)
+        if project_name and not data.get("project_id"):
+            if project_name not in project_ids:
+                return None, f"Unknown project: {project_name}"
+            data["project_id"] = project_ids[project_name]
+        
+        username = data.pop("assigned_to_name", None)
+        if username and not data.get("assigned_to"):
+            if username not in user_ids:
+                return None, f"Unknown user: {username}"
+            data["assigned_to"] = user_ids[username]
+        
+        try:
+            return TaskCreate.model_validate(data).model_dump(), None
+        except ValidationError as e:
+            return None, validation_message(e)
+    
+    async def import_tasks(
+        self,
+        file: BinaryIO,
+        import_format: str,
+        user_id: str,
+        notify: bool = False
+    ) -> dict:
+        """Import tasks from an NDJSON or CSV upload in validated, batched inserts"""
+        stream = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        rows = iter_csv_rows(stream) if import_format == "csv" else iter_ndjson_rows(stream)
+        
+        summary = {"total_rows": 0, "imported": 0, "rejected": 0, "errors": [], "aborted": None}
+        
+        def reject(line_number: int, error: str):
+            summary["rejected"] += 1
+            if len(summary["errors"]) < settings.IMPORT_MAX_REPORTED_ERRORS:
+                summary["errors"].append({"row": line_number, "error": error})
+        
+        # Detached rather than closed, the upload file belongs to the caller
+        try:
+            project_ids: Dict[str, str] = {}
+            user_ids: Dict[str, str] = {}
+            while True:
+                # The upload is spooled to disk, parse the next batch off the event loop
+                try:
+                    batch = await run_in_threadpool(lambda: list(islice(rows, settings.IMPORT_BATCH_SIZE)))
+                except (UnicodeDecodeError, csv.Error) as e:
+                    summary["aborted"] = f"Unreadable input after row {summary['total_rows']}: {e}"
+                    break
+                if not batch:
+                    break
+                
+                summary["total_rows"] += len(batch)
+                # Reject rows whose names can't be looked up before resolving the batch
+                for position, (line_number, row, error) in enumerate(batch):
+                    name_error = _import_name_error(row) if row else None
+                    if name_error:
+                        batch[position] = (line_number, None, name_error)
+                await self._resolve_import_names(batch, project_ids, user_ids)
+                
+                tasks = []
+                line_numbers = []
+                for line_number, row, error in batch:
+                    task = None
+                    if error is None:
+                        task, error = self._import_row(row, project_ids, user_ids)
+                    if error:
+                        reject(line_number, error)
+                        continue
+                    tasks.append(task)
+                    line_numbers.append(line_number)
+                
+                if not tasks:
+                    continue
+                
+                async with counter_fence.write():
+                    errors = await self.task_repo.create_many(tasks)
+                    await self.counter_service.record(
+                        added=[task for position, task in enumerate(tasks) if position not in errors]
+                    )
+                created = []
+                history_entries = []
+                notifications = []
+                for position, task in enumerate(tasks):
+                    if position in errors:
+                        reject(line_numbers[position], errors[position])
+                        continue
+                    
+                    summary["imported"] += 1
+                    created.append(task)
+                    task_history, task_notifications = self._creation_side_effects(task, user_id)
+                    history_entries.extend(task_history)
+                    if notify:
+                        notifications.extend(task_notifications)
+                
+                report_cache.invalidate()
+                await write_behind.submit(self.history_writer, history_entries)
+                await write_behind.submit(self.notification_repo, notifications)
+        finally:
+            stream.detach()
+        return summary
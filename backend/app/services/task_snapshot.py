@@ -0,0 +1,291 @@
+import asyncio
+import time
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.config import settings
+from app.repositories.task_repository import TaskRepository
+from app.schemas.task import TaskStatus, TaskPriority
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Hashable
+
+# Fields copied into the snapshot
+SNAPSHOT_FIELDS = [
+    "status", "priority", "project_id", "assigned_to",
+    "due_date", "created_at", "updated_at", "estimated_hours"
+]
+
+# Writes stamp updated_at before they commit, so each refresh re-reads a short
+# window behind the last one to catch writes that committed late
+_REFRESH_OVERLAP = timedelta(seconds=5)
+
+_DATETIME = "datetime64[ms]"
+
+# Tasks read and encoded per round trip during a refresh
+_REFRESH_BATCH = 5000
+
+
+class _Categories:
+    """Dictionary encoding of a categorical column (-1 stands for a missing value)"""
+    
+    def __init__(self, values: Optional[List[Hashable]] = None):
+        self.values: List[Hashable] = []
+        self.codes: Dict[Hashable, int] = {}
+        for value in values or []:
+            self.encode(value)
+    
+    def encode(self, value: Any) -> int:
+        """Code of a value, assigning the next one to values not seen yet"""
+        if value is None or value == "":
+            return -1
+        value = getattr(value, "value", value)
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+    
+    def lookup(self, value: Any) -> Optional[int]:
+        """Code of a known value, or None"""
+        return self.codes.get(getattr(value, "value", value))
+    
+    def copy(self) -> "_Categories":
+        """Independent copy with the same codes"""
+        copied = _Categories()
+        copied.values = list(self.values)
+        copied.codes = dict(self.codes)
+        return copied
+
+
+class _Table:
+    """Rows of the snapshot: ID index, categories and one array per field"""
+    
+    def __init__(self):
+        self.status = _Categories([s.value for s in TaskStatus])
+        self.priority = _Categories([p.value for p in TaskPriority])
+        self.projects = _Categories()
+        self.assignees = _Categories()
+        self.rows: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.columns: Dict[str, np.ndarray] = self._empty_columns(0)
+        self.watermark: Optional[datetime] = None
+    
+    @staticmethod
+    def _empty_columns(size: int) -> Dict[str, np.ndarray]:
+        """Unset columns for a number of rows"""
+        return {
+            "status": np.full(size, -1, dtype=np.int16),
+            "priority": np.full(size, -1, dtype=np.int16),
+            "project": np.full(size, -1, dtype=np.int32),
+            "assignee": np.full(size, -1, dtype=np.int32),
+            "due_date": np.full(size, np.datetime64("NaT"), dtype=_DATETIME),
+            "created_at": np.full(size, np.datetime64("NaT"), dtype=_DATETIME),
+            "estimated_hours": np.full(size, np.nan, dtype=np.float64)
+        }
+    
+    def copy(self) -> "_Table":
+        """Independent copy a refresh can modify while readers use the original"""
+        table = _Table.__new__(_Table)
+        table.status = self.status.copy()
+        table.priority = self.priority.copy()
+        table.projects = self.projects.copy()
+        table.assignees = self.assignees.copy()
+        table.rows = dict(self.rows)
+        table.ids = list(self.ids)
+        table.columns = {name: column.copy() for name, column in self.columns.items()}
+        table.watermark = self.watermark
+        return table
+    
+    def apply(self, tasks: List[dict]):
+        """Insert or overwrite the rows of changed tasks"""
+        for task in tasks:
+            task["_id"] = str(task["_id"])
+        
+        new_ids = list(dict.fromkeys(task["_id"] for task in tasks if task["_id"] not in self.rows))
+        if new_ids:
+            start = len(self.ids)
+            grown = self._empty_columns(len(new_ids))
+            self.columns = {
+                name: np.concatenate([column, grown[name]])
+                for name, column in self.columns.items()
+            }
+            for offset, task_id in enumerate(new_ids):
+                self.rows[task_id] = start + offset
+                self.ids.append(task_id)
+        
+        rows = np.fromiter((self.rows[task["_id"]] for task in tasks), dtype=np.int64, count=len(tasks))
+        columns = self.columns
+        columns["status"][rows] = [self.status.encode(task.get("status")) for task in tasks]
+        columns["priority"][rows] = [self.priority.encode(task.get("priority")) for task in tasks]
+        columns["project"][rows] = [self.projects.encode(task.get("project_id")) for task in tasks]
+        columns["assignee"][rows] = [self.assignees.encode(task.get("assigned_to")) for task in tasks]
+        columns["due_date"][rows] = np.array([task.get("due_date") for task in tasks], dtype=_DATETIME)
+        columns["created_at"][rows] = np.array([task.get("created_at") for task in tasks], dtype=_DATETIME)
+        columns["estimated_hours"][rows] = np.array(
+            [task.get("estimated_hours") for task in tasks], dtype=np.float64
+        )
+        
+        latest = max((task["updated_at"] for task in tasks if task.get("updated_at")), default=None)
+        if latest and (self.watermark is None or latest > self.watermark):
+            self.watermark = latest
+    
+    def retain(self, live_ids: set):
+        """Drop deleted tasks, compacting the arrays"""
+        keep = np.fromiter((task_id in live_ids for task_id in self.ids), dtype=bool, count=len(self.ids))
+        self.columns = {name: column[keep] for name, column in self.columns.items()}
+        self.ids = [task_id for task_id, kept in zip(self.ids, keep) if kept]
+        self.rows = {task_id: row for row, task_id in enumerate(self.ids)}
+
+
+def _collect_ids(live_ids: set, tasks: List[dict]):
+    """Add a batch of {"_id": ObjectId} documents to a set of string IDs"""
+    live_ids.update(str(task["_id"]) for task in tasks)
+
+
+class TaskSnapshot:
+    """Columnar in-memory copy of the tasks collection for vectorized reports
+    
+    Categorical fields (status, priority, project, assignee) are stored as
+    integer codes, dates as datetime64 and estimated hours as floats, one
+    NumPy array per field. Refreshes are incremental: only tasks whose
+    updated_at moved are re-read, and deleted tasks are dropped when the
+    row count no longer matches the collection. Reports filter with boolean
+    masks and group with bincount instead of iterating documents.
+    
+    A refresh streams tasks in batches and encodes them in a worker thread
+    on a copy of the table, which replaces the current one once complete,
+    so request handling is never blocked and reports never see a
+    half-applied refresh.
+    """
+    
+    def __init__(self, refresh_interval: float = settings.ANALYTICS_REFRESH_SECONDS):
+        self.refresh_interval = refresh_interval
+        self._table = _Table()
+        self._refreshed_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+    
+    @property
+    def size(self) -> int:
+        """Number of live tasks in the snapshot"""
+        return len(self._table.ids)
+    
+    async def refresh(self, db: AsyncIOMotorDatabase, force: bool = False):
+        """Bring the snapshot up to date, at most once per refresh interval"""
+        async with self._lock:
+            if (
+                not force and self._refreshed_at is not None
+                and time.monotonic() - self._refreshed_at < self.refresh_interval
+            ):
+                return
+            
+            task_repo = TaskRepository(db)
+            current = self._table
+            since = current.watermark - _REFRESH_OVERLAP if current.watermark else None
+            
+            # Copied lazily: a refresh that finds nothing changed costs no copy
+            table = None
+            async for tasks in task_repo.iter_updated_since(since, SNAPSHOT_FIELDS, _REFRESH_BATCH):
+                if table is None:
+                    table = await asyncio.to_thread(current.copy)
+                await asyncio.to_thread(table.apply, tasks)
+            
+            # Deletes leave no trace in updated_at; a count mismatch reveals them
+            if await task_repo.count() != len((table or current).ids):
+                live_ids = set()
+                async for tasks in task_repo.iter_ids(_REFRESH_BATCH):
+                    await asyncio.to_thread(_collect_ids, live_ids, tasks)
+                if table is None:
+                    table = await asyncio.to_thread(current.copy)
+                await asyncio.to_thread(table.retain, live_ids)
+            
+            if table is not None:
+                self._table = table
+            self._refreshed_at = time.monotonic()
+    
+    def summarize(self, filters: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """Counts, estimated hours and groupings of the tasks matching the filters"""
+        # One table for the whole report; a refresh swaps in a new one
+        table = self._table
+        columns = table.columns
+        mask = np.ones(len(table.ids), dtype=bool)
+        
+        for field, categories, column in (
+            ("status", table.status, "status"),
+            ("priority", table.priority, "priority"),
+            ("project_id", table.projects, "project"),
+            ("assigned_to", table.assignees, "assignee")
+        ):
+            if filters.get(field):
+                code = categories.lookup(filters[field])
+                if code is None:
+                    mask[:] = False
+                else:
+                    mask &= columns[column] == code
+        
+        # NaT compares false, so tasks without a due date drop out of due windows
+        if filters.get("due_from"):
+            mask &= columns["due_date"] >= np.datetime64(filters["due_from"], "ms")
+        if filters.get("due_to"):
+            mask &= columns["due_date"] < np.datetime64(filters["due_to"], "ms")
+        
+        completed = table.status.lookup(TaskStatus.COMPLETADA)
+        overdue = mask & (columns["due_date"] < np.datetime64(now, "ms")) & (columns["status"] != completed)
+        if filters.get("overdue"):
+            mask = overdue
+        
+        status = columns["status"][mask]
+        priority = columns["priority"][mask]
+        hours = np.nan_to_num(columns["estimated_hours"][mask])
+        
+        # Priority x status matrix from one bincount over combined codes
+        n_status = len(table.status.values)
+        n_priority = len(table.priority.values)
+        known = (status >= 0) & (priority >= 0)
+        matrix = np.bincount(
+            priority[known].astype(np.int64) * n_status + status[known],
+            minlength=n_priority * n_status
+        ).reshape(n_priority, n_status)
+        
+        return {
+            "count": int(mask.sum()),
+            "estimated_hours": float(hours.sum()),
+            "overdue": int(overdue.sum()),
+            "by_status": self._group(status, hours, table.status),
+            "by_priority": self._group(priority, hours, table.priority),
+            "matrix": {
+                str(p): {str(s): int(matrix[i, j]) for j, s in enumerate(table.status.values)}
+                for i, p in enumerate(table.priority.values)
+            },
+            "by_project": self._group(columns["project"][mask], hours, table.projects),
+            "by_assignee": self._group(columns["assignee"][mask], hours, table.assignees)
+        }
+    
+    @staticmethod
+    def _group(codes: np.ndarray, hours: np.ndarray, categories: _Categories) -> List[Dict[str, Any]]:
+        """Task count and estimated hours per category (None for missing values)"""
+        size = len(categories.values) + 1
+        # Shift by one so missing values (-1) land in bucket 0
+        shifted = codes.astype(np.int64) + 1
+        counts = np.bincount(shifted, minlength=size)
+        totals = np.bincount(shifted, weights=hours, minlength=size)
+        
+        groups = []
+        for bucket in np.flatnonzero(counts):
+            groups.append({
+                "key": categories.values[bucket - 1] if bucket else None,
+                "count": int(counts[bucket]),
+                "estimated_hours": float(totals[bucket])
+            })
+        return groups
+    
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot size and freshness"""
+        return {
+            "rows": self.size,
+            "watermark": self._table.watermark,
+            "refreshed_seconds_ago": (
+                time.monotonic() - self._refreshed_at if self._refreshed_at is not None else None
+            )
+        }
+
+
+task_snapshot = TaskSnapshot()
@@ -0,0 +1,70 @@
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.config import settings
+from app.repositories.token_repository import RevokedTokenRepository
+from datetime import datetime
+from typing import Optional, Set
+
+
+class RevocationList:
+    """In-memory set of revoked token IDs, periodically refreshed from the database
+
+    Lets get_current_user reject revoked tokens without a database round trip.
+    Revocations made by other processes are picked up on the next refresh.
+    A refresh replaces the set with the database's, except for the tokens
+    revoked here since the previous refresh began, whose writes it may not
+    have seen yet.
+    """
+
+    def __init__(self, refresh_interval: float = settings.AUTH_REVOCATION_REFRESH_SECONDS):
+        self.refresh_interval = refresh_interval
+        self.revoked: Set[str] = set()
+        self._recent: Set[str] = set()
+        self._worker: Optional[asyncio.Task] = None
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """Whether a token ID has been revoked"""
+        return jti is not None and jti in self.revoked
+
+    async def revoke(self, db: AsyncIOMotorDatabase, jti: str, expires_at: datetime):
+        """Revoke a token here and for every other process"""
+        self.revoked.add(jti)
+        self._recent.add(jti)
+        await RevokedTokenRepository(db).revoke(jti, expires_at)
+
+    async def refresh(self, db: AsyncIOMotorDatabase):
+        """Reload the revoked token IDs (expired ones drop out)"""
+        previous, self._recent = self._recent, set()
+        try:
+            active = await RevokedTokenRepository(db).get_active_jtis()
+        except Exception:
+            self._recent |= previous
+            raise
+        self.revoked = active | previous | self._recent
+
+    def start(self, db: AsyncIOMotorDatabase):
+        """Start refreshing periodically in the background"""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        """Stop the background refresh"""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def _run(self, db: AsyncIOMotorDatabase):
+        """Refresh loop"""
+        while True:
+            try:
+                await self.refresh(db)
+            except Exception as e:
+                print(f"Revocation list refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,34 @@
+from app.repositories.user_repository import UserRepository
+from typing import Dict, Iterable, List, Optional
+
+
+class UsernameLoader:
+    """Batch resolution of user IDs to usernames
+    
+    Distinct IDs are fetched with one $in query projecting only the username,
+    and every answer (including IDs that match no user) is memoized, so an
+    ID is never looked up twice by the same loader. Services create one per
+    instance, which makes the memo last for a single request.
+    """
+    
+    def __init__(self, user_repo: UserRepository):
+        self.user_repo = user_repo
+        self._names: Dict[str, Optional[str]] = {}
+    
+    async def load_many(self, user_ids: Iterable[Optional[str]]) -> Dict[str, str]:
+        """Map user IDs to usernames, querying only the ones not seen before"""
+        user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id]
+        missing = [user_id for user_id in user_ids if user_id not in self._names]
+        if missing:
+            found = await self.user_repo.find_names_by_ids(missing)
+            for user_id in missing:
+                self._names[user_id] = found.get(user_id)
+        
+        return {user_id: self._names[user_id] for user_id in user_ids if self._names[user_id]}
+    
+    async def attach(self, documents: List[dict], field: str = "user_id") -> List[dict]:
+        """Set the username of the user referenced by each document (Unknown if missing)"""
+        names = await self.load_many(document.get(field) for document in documents)
+        for document in documents:
+            document["username"] = names.get(document.get(field), "Unknown")
+        return documents
@@ -0,0 +1,148 @@
+import asyncio
+from pymongo.errors import BulkWriteError
+from app.config import settings
+from typing import List, Optional, Any, Dict, Tuple
+
+# Queued after everything else on shutdown so the worker drains the queue first
+_STOP = object()
+
+_DUPLICATE_KEY = 11000
+
+
+def _only_duplicates(error: BulkWriteError) -> bool:
+    """Whether a batch failed only on documents an earlier attempt already inserted"""
+    write_errors = error.details.get("writeErrors", [])
+    if not write_errors or error.details.get("writeConcernErrors"):
+        return False
+    return all(write_error.get("code") == _DUPLICATE_KEY for write_error in write_errors)
+
+
+class WriteBehindQueue:
+    """In-process write-behind pipeline for history and notification documents
+
+    Documents are submitted together with the repository that stores them and
+    written by a background worker in insert_many batches, flushed when a
+    batch is full or when the time window after its first document expires.
+    The queue is bounded: when it is full, submit() waits (backpressure).
+    Failed flushes are retried with exponential backoff; documents keep the
+    _id assigned on the first attempt, so a retry never inserts twice.
+    In synchronous mode, or before start(), documents are written inline.
+    """
+
+    def __init__(
+        self,
+        max_size: int = settings.WRITE_BEHIND_MAX_QUEUE,
+        batch_size: int = settings.WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = settings.WRITE_BEHIND_FLUSH_MS / 1000,
+        synchronous: bool = settings.WRITE_BEHIND_SYNC,
+        retries: int = settings.WRITE_BEHIND_RETRIES,
+        retry_backoff: float = settings.WRITE_BEHIND_RETRY_BACKOFF_MS / 1000
+    ):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.synchronous = synchronous
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether documents are currently being written behind"""
+        return self._worker is not None and not self._worker.done()
+
+    @property
+    def pending(self) -> int:
+        """Number of documents waiting to be written"""
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self):
+        """Start the background worker (no-op in synchronous mode)"""
+        if self.synchronous or self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush every queued document and stop the background worker"""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._worker
+        self._worker = None
+
+    async def submit(self, repo: Any, documents: List[dict]):
+        """Queue documents for a repository's create_many"""
+        if not documents:
+            return
+
+        # Stamp now so timestamps reflect the event, not the flush
+        repo.stamp(documents)
+
+        if not self.running:
+            await repo.create_many(documents)
+            return
+
+        for document in documents:
+            await self._queue.put((repo, document))
+
+    async def _run(self):
+        """Collect queued documents into batches and flush them"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[Any, dict]]):
+        """Write a batch with one insert_many per collection"""
+        groups: Dict[str, Tuple[Any, List[dict]]] = {}
+        for repo, document in batch:
+            groups.setdefault(repo.collection.name, (repo, []))[1].append(document)
+
+        for name, (repo, documents) in groups.items():
+            await self._write(name, repo, documents)
+
+    async def _write(self, name: str, repo: Any, documents: List[dict]):
+        """Insert a group of documents, retrying with exponential backoff before giving up"""
+        for attempt in range(self.retries + 1):
+            try:
+                await repo.create_many(documents)
+                return
+            except BulkWriteError as e:
+                if _only_duplicates(e):
+                    return
+                error = e
+            except Exception as e:
+                error = e
+
+            if attempt < self.retries:
+                delay = self.retry_backoff * 2 ** attempt
+                print(f"Write-behind flush to {name} failed, retrying in {delay:.1f}s: {error}")
+                await asyncio.sleep(delay)
+
+        print(f"Write-behind flush to {name} failed, dropping {len(documents)} documents: {error}")
+
+
+write_behind = WriteBehindQueue()
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, Iterator, List, Optional, TextIO, Tuple
+
+# Column order of task CSV exports
+TASK_EXPORT_FIELDS = [
+    "_id", "title", "description", "status", "priority",
+    "project_id", "project_name", "assigned_to", "assigned_to_name",
+    "due_date", "estimated_hours", "created_at", "updated_at"
+]
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize the non-JSON types found in task documents"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def to_ndjson_line(document: dict) -> str:
+    """Serialize a document as one NDJSON line"""
+    return json.dumps(document, default=_json_default, ensure_ascii=False) + "\n"
+
+
+def csv_line(values: List[Any]) -> str:
+    """Serialize a list of values as one CSV line"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def to_csv_line(document: dict, fields: List[str]) -> str:
+    """Serialize the given fields of a document as one CSV line"""
+    values = []
+    for field in fields:
+        value = document.get(field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        values.append("" if value is None else value)
+    return csv_line(values)
+
+
+def iter_ndjson_rows(stream: TextIO) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (line number, row, error) for each non-blank NDJSON line"""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, row, None
+
+
+# DictReader key for the cells of a record beyond the header
+_EXTRA_CELLS = "__extra__"
+
+
+def iter_csv_rows(stream: TextIO) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (line number, row, error) for each CSV record, with empty cells as None
+    
+    Records with more cells than the header are rejected rather than
+    silently losing the extra cells.
+    """
+    reader = csv.DictReader(stream, restkey=_EXTRA_CELLS)
+    for row in reader:
+        extra = row.pop(_EXTRA_CELLS, None)
+        if extra:
+            yield reader.line_num, None, f"Row has {len(extra)} more cells than the header"
+            continue
+        yield reader.line_num, {key: (value if value != "" else None) for key, value in row.items()}, None
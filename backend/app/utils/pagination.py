@@ -0,0 +1,42 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+from bson import ObjectId
+
+
+def encode_cursor(sort_value: Any, doc_id: str) -> str:
+    """Encode the last (sort key, _id) pair of a page into an opaque cursor"""
+    if isinstance(sort_value, datetime):
+        payload = {"k": sort_value.isoformat(), "t": "dt", "id": str(doc_id)}
+    else:
+        payload = {"k": sort_value, "t": "num", "id": str(doc_id)}
+    encoded = json.dumps(payload).encode("utf-8")
+    return base64.urlsafe_b64encode(encoded).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    """Decode an opaque cursor, raising ValueError if it is malformed"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if payload.get("t", "dt") == "dt":
+            sort_value = datetime.fromisoformat(payload["k"])
+        else:
+            sort_value = float(payload["k"])
+        return sort_value, ObjectId(payload["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_filter(sort_field: str, cursor: Optional[str]) -> dict:
+    """Build the query clause that continues a descending (sort_field, _id) scan"""
+    if not cursor:
+        return {}
+
+    sort_value, last_id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {sort_field: {"$lt": sort_value}},
+            {sort_field: sort_value, "_id": {"$lt": last_id}}
+        ]
+    }
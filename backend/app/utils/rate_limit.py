@@ -0,0 +1,42 @@
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class TokenBucketLimiter:
+    """In-process token-bucket rate limiter with one bucket per key
+
+    Each bucket holds up to `capacity` tokens and refills at `refill_rate`
+    tokens per second. Buckets live in an LRU-ordered map capped at
+    `max_keys`, so memory stays bounded however many keys are seen; an
+    evicted key simply starts again with a full bucket.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float, max_keys: int):
+        if capacity < 1:
+            raise ValueError(f"Token bucket capacity must be at least 1, got {capacity}")
+        if refill_rate <= 0:
+            raise ValueError(f"Token bucket refill rate must be positive, got {refill_rate}")
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def acquire(self, key: Hashable) -> float:
+        """Take a token for a key; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_rate)
+
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / self.refill_rate
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return retry_after
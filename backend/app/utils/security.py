@@ -1,9 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Callable, Any
+import asyncio
+import hashlib
+import hmac
+import secrets
+import uuid
 import jwt
 import bcrypt
 from app.config import settings
 
+# bcrypt releases the GIL, so a small thread pool hashes in parallel without
+# blocking the event loop
+_hashing_pool = ThreadPoolExecutor(
+    max_workers=settings.BCRYPT_WORKERS,
+    thread_name_prefix="bcrypt"
+)
+_pending_hashes = 0
+
+
+class HashingPoolBusy(Exception):
+    """Raised when too many password hashes are already queued"""
+    pass
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -11,12 +30,44 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def get_password_hash(password: str) -> str:
-    """Hash a password using bcrypt"""
-    salt = bcrypt.gensalt()
+    """Hash a password using bcrypt with the configured work factor"""
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a hash was made with a different work factor than the configured one"""
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+async def _run_on_hashing_pool(func: Callable[..., Any], *args) -> Any:
+    """Run a bcrypt call on the hashing pool, refusing work beyond the queue limit"""
+    global _pending_hashes
+    if _pending_hashes >= settings.BCRYPT_MAX_PENDING:
+        raise HashingPoolBusy("Too many concurrent password operations")
+    
+    _pending_hashes += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hashing_pool, func, *args)
+    finally:
+        _pending_hashes -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool"""
+    return await _run_on_hashing_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the hashing pool"""
+    return await _run_on_hashing_pool(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -25,11 +76,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
+def generate_refresh_token() -> str:
+    """Generate an opaque random refresh token"""
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """Keyed hash of a refresh token, as stored in the database"""
+    return hmac.new(settings.SECRET_KEY.encode('utf-8'), token.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
 def decode_access_token(token: str) -> Optional[dict]:
     """Decode and verify a JWT token"""
     try:
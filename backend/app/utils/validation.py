@@ -0,0 +1,9 @@
+from pydantic import ValidationError
+
+
+def validation_message(error: ValidationError) -> str:
+    """Flatten a pydantic validation error into a one-line message"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors()
+    )
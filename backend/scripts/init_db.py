@@ -21,6 +21,9 @@ sys.path.append(str(Path(__file__).parent.parent))
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.config import settings
 from app.utils.security import get_password_hash
+from app.services.index_service import IndexService
+from app.services.counter_service import CounterService
+from app.services.activity_service import ActivityService
 from datetime import datetime, timedelta
 
 
@@ -41,39 +44,16 @@ async def init_database():
     await db.comments.drop()
     await db.notifications.drop()
     await db.history.drop()
+    await db.task_counters.drop()
+    await db.task_counters_state.drop()
+    await db.history_daily.drop()
+    await db.history_archive.drop()
+    await db.history_archive_state.drop()
     
     # Create indexes
     print("Creating indexes...")
     
-    # Users indexes
-    await db.users.create_index("username", unique=True)
-    await db.users.create_index("email", unique=True)
-    
-    # Projects indexes
-    await db.projects.create_index("name")
-    await db.projects.create_index("created_by")
-    
-    # Tasks indexes
-    await db.tasks.create_index("status")
-    await db.tasks.create_index("priority")
-    await db.tasks.create_index("project_id")
-    await db.tasks.create_index("assigned_to")
-    await db.tasks.create_index("due_date")
-    await db.tasks.create_index("created_at")
-    
-    # Comments indexes
-    await db.comments.create_index("task_id")
-    await db.comments.create_index("created_at")
-    
-    # Notifications indexes
-    await db.notifications.create_index("user_id")
-    await db.notifications.create_index("read")
-    await db.notifications.create_index("created_at")
-    
-    # History indexes
-    await db.history.create_index("task_id")
-    await db.history.create_index("timestamp")
-    await db.history.create_index([("task_id", 1), ("timestamp", -1)])
+    await IndexService(db).reconcile()
     
     print("Indexes created successfully")
     
@@ -85,6 +65,7 @@ async def init_database():
             "username": "admin",
             "email": "admin@taskmanager.com",
             "hashed_password": get_password_hash("admin123"),
+            "is_admin": True,
             "created_at": datetime.utcnow()
         },
         {
@@ -217,6 +198,9 @@ async def init_database():
     task_ids = [str(id) for id in result.inserted_ids]
     print(f"Created {len(tasks)} tasks")
     
+    # Tasks were inserted directly, build their dashboard counters
+    await CounterService(db).rebuild()
+    
     # Create sample comments
     print("Creating sample comments...")
     
@@ -259,9 +243,8 @@ async def init_database():
         {
             "task_id": task_ids[0],
             "user_id": user_ids[0],
-            "action": "STATUS_CHANGED",
-            "old_value": "Pendiente",
-            "new_value": "Completada",
+            "action": "UPDATED",
+            "changes": [{"field": "status", "old": "Pendiente", "new": "Completada"}],
             "timestamp": now - timedelta(days=5)
         },
         {
@@ -275,9 +258,8 @@ async def init_database():
         {
             "task_id": task_ids[1],
             "user_id": user_ids[2],
-            "action": "STATUS_CHANGED",
-            "old_value": "Pendiente",
-            "new_value": "En Progreso",
+            "action": "UPDATED",
+            "changes": [{"field": "status", "old": "Pendiente", "new": "En Progreso"}],
             "timestamp": now - timedelta(days=1)
         }
     ]
@@ -285,6 +267,9 @@ async def init_database():
     await db.history.insert_many(history)
     print(f"Created {len(history)} history entries")
     
+    # History was inserted directly, build its daily activity rollup
+    await ActivityService(db).rebuild()
+    
     # Create sample notifications
     print("Creating sample notifications...")
     
@@ -0,0 +1,39 @@
+"""
+Task Counter Rebuild Script
+
+Recomputes the materialized task counters (task_counters collection) from the
+tasks and prints every counter that had drifted from the real counts.
+
+Run it after writing tasks outside the API, or to audit the counters:
+python scripts/rebuild_counters.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.services.counter_service import CounterService
+
+
+async def rebuild_counters():
+    """Rebuild the task counters and report the drift found"""
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+    
+    print(f"Rebuilding task counters in: {settings.MONGODB_DB_NAME}")
+    result = await CounterService(db).rebuild()
+    
+    for entry in result["drift"]:
+        print(f"  {entry['key']} {entry['field']}: stored {entry['stored']}, actual {entry['actual']}")
+    print(f"Rebuilt {result['keys']} counters, {len(result['drift'])} drifted fields")
+    
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_counters())
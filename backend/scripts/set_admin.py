@@ -0,0 +1,51 @@
+"""
+Admin Rights Script
+
+Grants or revokes access to /api/admin for an existing user by setting the
+is_admin flag on its document. Admin rights are never granted through the
+API, so this is the only way to create an administrator:
+python scripts/set_admin.py <username>
+python scripts/set_admin.py <username> --revoke
+
+Running servers pick the change up once their user cache entry expires
+(USER_CACHE_TTL_SECONDS).
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.repositories.user_repository import UserRepository
+
+
+async def set_admin(username: str, is_admin: bool) -> bool:
+    """Set or clear the admin flag of a user, returning whether the user exists"""
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+    
+    user_repo = UserRepository(db)
+    user = await user_repo.find_by_username(username)
+    if user:
+        await user_repo.update(user["_id"], {"is_admin": is_admin})
+        print(f"{username} is {'now' if is_admin else 'no longer'} an administrator")
+    else:
+        print(f"User not found: {username}")
+    
+    client.close()
+    return user is not None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grant or revoke admin rights")
+    parser.add_argument("username")
+    parser.add_argument("--revoke", action="store_true", help="Remove the admin rights instead")
+    args = parser.parse_args()
+    
+    if not asyncio.run(set_admin(args.username, not args.revoke)):
+        sys.exit(1)
@@ -18,6 +18,7 @@ function App() {
     const [users, setUsers] = useState([]);
     const [stats, setStats] = useState(null);
     const [notifications, setNotifications] = useState([]);
+    const [unreadCount, setUnreadCount] = useState(0);
     const [history, setHistory] = useState([]);
     const [comments, setComments] = useState([]);
     const [selectedTaskId, setSelectedTaskId] = useState(null);
@@ -72,12 +73,22 @@ function App() {
         await Promise.all([
             loadTasks(),
             loadProjects(),
-            loadUsers(),
-            loadStats(),
-            loadNotifications(),
+            loadDashboard(),
         ]);
     };
 
+    const loadDashboard = async () => {
+        try {
+            const data = await reportsAPI.getDashboard();
+            setUsers(data.users);
+            setStats(data.stats);
+            setNotifications(data.notifications);
+            setUnreadCount(data.unread_count);
+        } catch (error) {
+            console.error('Error loading dashboard:', error);
+        }
+    };
+
     const loadTasks = async () => {
         try {
             const data = await tasksAPI.getAll();
@@ -96,15 +107,6 @@ function App() {
         }
     };
 
-    const loadUsers = async () => {
-        try {
-            const data = await reportsAPI.getUsers();
-            setUsers(data);
-        } catch (error) {
-            console.error('Error loading users:', error);
-        }
-    };
-
     const loadStats = async () => {
         try {
             const data = await reportsAPI.getStats();
@@ -147,8 +149,15 @@ function App() {
         setIsAuthenticated(true);
     };
 
-    const handleLogout = () => {
+    const handleLogout = async () => {
+        try {
+            // Revoke the tokens server-side before forgetting them
+            await authAPI.logout();
+        } catch (error) {
+            console.error('Error logging out:', error);
+        }
         localStorage.removeItem('token');
+        localStorage.removeItem('refreshToken');
         localStorage.removeItem('user');
         setCurrentUser(null);
         setIsAuthenticated(false);
@@ -302,6 +311,7 @@ function App() {
     const markAllNotificationsRead = async () => {
         try {
             await notificationsAPI.markAllAsRead();
+            setUnreadCount(0);
             await loadNotifications();
         } catch (error) {
             console.error('Error marking notifications as read:', error);
@@ -934,7 +944,7 @@ function App() {
                         <div className="tab-content">
                             <div className="section-card">
                                 <div className="section-header">
-                                    <h2>Notificaciones ({notifications.length})</h2>
+                                    <h2>Notificaciones ({unreadCount})</h2>
                                     {notifications.length > 0 && (
                                         <button className="btn btn-secondary" onClick={markAllNotificationsRead}>
                                             Marcar todas como leídas
@@ -18,6 +18,7 @@ function Login({ onLoginSuccess }) {
 
             // Store token and user info
             localStorage.setItem('token', data.access_token);
+            localStorage.setItem('refreshToken', data.refresh_token);
             localStorage.setItem('user', JSON.stringify(data.user));
 
             onLoginSuccess(data.user);
@@ -25,20 +25,60 @@ api.interceptors.request.use(
     }
 );
 
+// Exchange the refresh token once for all requests that failed together
+let refreshPromise = null;
+const refreshAccessToken = async () => {
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (!refreshToken) {
+        throw new Error('No refresh token');
+    }
+    const response = await axios.post(`${API_BASE_URL}/auth/refresh`, { refresh_token: refreshToken });
+    localStorage.setItem('token', response.data.access_token);
+    localStorage.setItem('refreshToken', response.data.refresh_token);
+    return response.data.access_token;
+};
+
 // Handle response errors
 api.interceptors.response.use(
     (response) => response,
-    (error) => {
-        if (error.response?.status === 401) {
-            // Token expired or invalid
-            localStorage.removeItem('token');
-            localStorage.removeItem('user');
-            window.location.reload();
+    async (error) => {
+        const original = error.config;
+        if (error.response?.status === 401 && original && !original._retried) {
+            // Access token expired: refresh it and retry the request once
+            original._retried = true;
+            try {
+                refreshPromise = refreshPromise || refreshAccessToken();
+                const token = await refreshPromise;
+                original.headers.Authorization = `Bearer ${token}`;
+                return api(original);
+            } catch (refreshError) {
+                // Refresh token expired or invalid
+                localStorage.removeItem('token');
+                localStorage.removeItem('refreshToken');
+                localStorage.removeItem('user');
+                window.location.reload();
+            } finally {
+                refreshPromise = null;
+            }
         }
         return Promise.reject(error);
     }
 );
 
+// Follow next_cursor until every page of a paginated endpoint is loaded
+const fetchAllPages = async (url, params = {}) => {
+    const items = [];
+    let cursor = null;
+    do {
+        const response = await api.get(url, {
+            params: { ...params, limit: 200, ...(cursor ? { cursor } : {}) },
+        });
+        items.push(...response.data.items);
+        cursor = response.data.next_cursor;
+    } while (cursor);
+    return items;
+};
+
 // Auth APIs
 export const authAPI = {
     login: async (username, password) => {
@@ -55,13 +95,18 @@ export const authAPI = {
         const response = await api.get('/auth/me');
         return response.data;
     },
+
+    logout: async () => {
+        const refreshToken = localStorage.getItem('refreshToken');
+        const response = await api.post('/auth/logout', refreshToken ? { refresh_token: refreshToken } : {});
+        return response.data;
+    },
 };
 
 // Tasks APIs
 export const tasksAPI = {
     getAll: async () => {
-        const response = await api.get('/tasks');
-        return response.data;
+        return fetchAllPages('/tasks');
     },
 
     get: async (id) => {
@@ -85,8 +130,7 @@ export const tasksAPI = {
     },
 
     search: async (filters) => {
-        const response = await api.get('/tasks/search', { params: filters });
-        return response.data;
+        return fetchAllPages('/tasks/search', filters);
     },
 };
 
@@ -147,18 +191,22 @@ export const notificationsAPI = {
 // History APIs
 export const historyAPI = {
     getByTask: async (taskId) => {
-        const response = await api.get(`/history/task/${taskId}`);
-        return response.data;
+        return fetchAllPages(`/history/task/${taskId}`);
     },
 
     getAll: async (limit = 100) => {
         const response = await api.get('/history', { params: { limit } });
-        return response.data;
+        return response.data.items;
     },
 };
 
 // Reports APIs
 export const reportsAPI = {
+    getDashboard: async () => {
+        const response = await api.get('/reports/dashboard');
+        return response.data;
+    },
+
     getStats: async () => {
         const response = await api.get('/reports/stats');
         return response.data;